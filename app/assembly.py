@@ -0,0 +1,173 @@
+import hashlib
+import os
+import random
+import struct
+import threading
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
+from app.models import Question, QuestionAssignment
+from app.question_cache import parse_question_id
+from app.responses import CachedPayload
+from app.state import shared_state
+from app.writer import writer
+
+# Questions drawn per team, split across difficulties in proportion to the bank. 0 = everyone gets the whole bank
+QUIZ_QUESTIONS_PER_TEAM = int(os.getenv("QUIZ_QUESTIONS_PER_TEAM", "0"))
+QUIZ_SEED = os.getenv("QUIZ_SEED", "puzzlemania")  # change between events to get different draws
+TEAM_SET_CACHE_SIZE = int(os.getenv("TEAM_SET_CACHE_SIZE", "5000"))
+DIFFICULTY_ORDER = ("Easy", "Medium", "Hard")
+
+
+def assignments_enabled() -> bool:
+    return QUIZ_QUESTIONS_PER_TEAM > 0
+
+
+def pack_ids(ids) -> bytes:
+    return struct.pack(f"<{len(ids)}I", *ids)
+
+
+def unpack_ids(packed: bytes) -> list:
+    packed = bytes(packed)
+    return list(struct.unpack(f"<{len(packed) // 4}I", packed))
+
+
+def _strata(bank):
+    """{difficulty: [question ids]} in quiz order, from (id, difficulty) rows."""
+    strata = defaultdict(list)
+    for question_id, difficulty in bank:
+        strata[difficulty].append(question_id)
+    order = {name: index for index, name in enumerate(DIFFICULTY_ORDER)}
+    return dict(sorted(strata.items(), key=lambda item: (order.get(item[0], len(order)), item[0])))
+
+
+def _allocate(strata: dict, size: int) -> dict:
+    """Largest-remainder split of ``size`` questions across the strata."""
+    total = sum(len(ids) for ids in strata.values())
+    size = min(size, total)
+    if not total:
+        return {}
+    exact = {name: size * len(ids) / total for name, ids in strata.items()}
+    counts = {name: int(share) for name, share in exact.items()}
+    by_remainder = sorted(strata, key=lambda name: counts[name] - exact[name])
+    for name in by_remainder[:size - sum(counts.values())]:
+        counts[name] += 1
+    return counts
+
+
+def draw(team_id: int, strata: dict, counts: dict) -> list:
+    """The team's questions: a seeded sample of each difficulty, easiest first."""
+    rng = random.Random(f"{QUIZ_SEED}:{team_id}")
+    ids = []
+    for name, stratum in strata.items():
+        ids.extend(rng.sample(stratum, counts.get(name, 0)))
+    return ids
+
+
+def assign_questions(session, team_ids) -> dict:
+    """Draws and stores (or redraws) the question set of each team; one upsert for all of them.
+
+    Returns {team_id: question ids}, which callers pass to
+    ``team_question_sets.remember`` once the write is committed.
+    """
+    team_ids = list(team_ids)
+    if not assignments_enabled() or not team_ids:
+        return {}
+    strata = _strata(session.exec(select(Question.id, Question.difficulty).order_by(Question.id)).all())
+    counts = _allocate(strata, QUIZ_QUESTIONS_PER_TEAM)
+    drawn = {team_id: draw(team_id, strata, counts) for team_id in team_ids}
+    rows = [{"team_id": team_id, "question_ids": pack_ids(ids)} for team_id, ids in drawn.items()]
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(QuestionAssignment)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["team_id"], set_={"question_ids": statement.excluded.question_ids}
+    ), rows)
+    return drawn
+
+
+async def assigned_ids(session, team_ids) -> dict:
+    """{team_id: set of assigned question ids}; teams without an assignment are left out."""
+    if not assignments_enabled():
+        return {}
+    rows = (await session.exec(
+        select(QuestionAssignment.team_id, QuestionAssignment.question_ids)
+        .where(QuestionAssignment.team_id.in_(list(team_ids)))
+    )).all()
+    return {team_id: set(unpack_ids(packed)) for team_id, packed in rows}
+
+
+def only_assigned(answers: dict, assigned) -> dict:
+    """Drops answers to questions outside the team's set; ``assigned`` None means no restriction."""
+    if assigned is None:
+        return answers
+    return {q_id: answer for q_id, answer in answers.items() if parse_question_id(q_id) in assigned}
+
+
+class TeamQuestionSets:
+    """Per-team question ids and /api/questions payloads.
+
+    Approval hands over the ids it just drew (and broadcasts them to the
+    other workers), so serving a freshly approved team needs no query at
+    all. Payloads are spliced from the cached question JSON and keyed by
+    the question-set generation, so any edit to the bank rebuilds them.
+    """
+
+    def __init__(self, maxsize: int = TEAM_SET_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # team_id -> [question ids, generation, CachedPayload]
+        self._lock = threading.Lock()
+
+    def _get(self, team_id: int):
+        with self._lock:
+            entry = self._entries.get(team_id)
+            if entry is not None:
+                self._entries.move_to_end(team_id)
+            return entry
+
+    def _store(self, drawn):
+        with self._lock:
+            if drawn is None:  # state backend resync
+                self._entries.clear()
+                return
+            for team_id, question_ids in drawn.items():
+                self._entries[int(team_id)] = [question_ids, None, None]
+                self._entries.move_to_end(int(team_id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def remember(self, drawn: dict):
+        """Takes {team_id: question ids} from a committed assign_questions()."""
+        if drawn:
+            self._store(drawn)
+            # JSON object keys must be strings; _store converts them back
+            shared_state.broadcast("question-assignments", {str(team_id): ids for team_id, ids in drawn.items()})
+
+    async def payload(self, session, question_set, team_id: int) -> CachedPayload:
+        """The team's questions in draw order, assigning them first if approval didn't."""
+        entry = self._get(team_id)
+        if entry is not None and entry[1] == question_set.generation:
+            return entry[2]
+        question_ids = entry[0] if entry is not None else await self._load(session, team_id)
+        body = question_set.subset_body(question_ids)
+        payload = CachedPayload(body, f'"{hashlib.sha1(body).hexdigest()}"', fast=True)
+        with self._lock:
+            self._entries[team_id] = [question_ids, question_set.generation, payload]
+            self._entries.move_to_end(team_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return payload
+
+    async def _load(self, session, team_id: int) -> list:
+        assignment = await session.get(QuestionAssignment, team_id)
+        if assignment is not None and assignment.question_ids:
+            return unpack_ids(assignment.question_ids)
+        # Approved before assignments were enabled, or while the bank was empty
+        drawn = await writer.run(lambda write_session: assign_questions(write_session, [team_id]), session=session)
+        return drawn[team_id]
+
+
+team_question_sets = TeamQuestionSets()
+shared_state.on("question-assignments", team_question_sets._store)
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from mimetypes import guess_type
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+STATIC_URL = "/static"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Without a build, pages link the plain files: let browsers reuse them for a while between page loads
+UNBUILT_CACHE_CONTROL = f"public, max-age={int(os.getenv('STATIC_MAX_AGE', '300'))}"
+# Paths whose names never get reused for different content
+IMMUTABLE_PREFIXES = ("build/", "img/uploads/")
+# Content-Encoding -> suffix of the precompressed file written by build_static.py
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def load_manifest() -> dict:
+    """The manifest written by build_static.py, or {} when it hasn't been run."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                try:
+                    with open(MANIFEST_PATH, encoding="utf-8") as f:
+                        _manifest = json.load(f)
+                except (OSError, ValueError):
+                    _manifest = {}
+    return _manifest
+
+
+def _is_current(path: str, entry: dict) -> bool:
+    # A source edited after the last build falls back to the plain file
+    try:
+        stat_result = os.stat(os.path.join(STATIC_DIR, path))
+    except OSError:
+        return False
+    return stat_result.st_size == entry["size"] and stat_result.st_mtime_ns == entry["mtime_ns"]
+
+
+def asset_url(path: str, variant: str = "file"):
+    """URL of a static file, fingerprinted when a current build exists.
+
+    ``variant`` picks an alternative output such as "webp"; it returns None
+    when there is no built variant, so templates can skip the <source>.
+    """
+    path = path.lstrip("/")
+    entry = load_manifest().get(path)
+    if entry and variant in entry and _is_current(path, entry):
+        return f"{STATIC_URL}/build/{entry[variant]}"
+    return f"{STATIC_URL}/{path}" if variant == "file" else None
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles that serves precompressed .br/.gz siblings and long-lived cache headers.
+
+    Fingerprinted build output and content-addressed uploads are cached as
+    immutable for a year. With a build, a plain file is only requested when
+    its source changed after the build, so it is always revalidated with its
+    ETag; without one, plain files get a short max-age.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        accepted = request_headers.get("accept-encoding", "")
+        media_type = None
+        encoding = None
+        vary = False
+        for candidate, suffix in PRECOMPRESSED:
+            compressed_path = f"{full_path}{suffix}"
+            if not os.path.isfile(compressed_path):
+                continue
+            vary = True
+            if candidate in accepted:
+                media_type = guess_type(str(full_path))[0]
+                full_path, stat_result, encoding = compressed_path, os.stat(compressed_path), candidate
+                break
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if encoding:
+            response.headers["content-encoding"] = encoding
+        if vary:
+            response.headers["vary"] = "Accept-Encoding"
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        if relative.startswith(IMMUTABLE_PREFIXES):
+            response.headers["cache-control"] = IMMUTABLE
+        else:
+            response.headers["cache-control"] = "no-cache" if load_manifest() else UNBUILT_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
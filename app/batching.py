@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BatchQueue:
+    """Async queue drained by one background task in batches.
+
+    A batch is handed to ``handler(items)`` once ``batch_size`` items are
+    waiting or ``flush_interval`` seconds have passed since the first one
+    arrived. ``put`` returns a future resolved after the item's batch has
+    been handled. Failed batches are retried a few times, then split in halves
+    until the items that fail on their own are found; only their futures are
+    failed, so one bad item doesn't take its whole batch down.
+    """
+
+    def __init__(self, name: str, handler, batch_size: int, flush_interval: float,
+                 maxsize: int = 0, max_retries: int = 3):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self._queue = None
+        self._task = None
+        # Monitoring
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.last_batch_size = 0
+        self._latencies = deque(maxlen=2048)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"batch-{self.name}")
+
+    async def stop(self):
+        """Flushes everything already queued, then stops the worker."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def put_nowait(self, item) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((time.perf_counter(), item, future))
+        except asyncio.QueueFull:
+            raise QueueFull(self.name)
+        return future
+
+    async def put(self, item) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((time.perf_counter(), item, future))
+        return future
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._handle(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _handle(self, batch):
+        items = [item for _, item, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                results = await self.handler(items)
+                break
+            except Exception as exc:
+                self.failures += 1
+                logger.exception("%s: batch of %d failed (attempt %d)", self.name, len(items), attempt + 1)
+                if attempt == self.max_retries:
+                    if len(batch) > 1:
+                        await self._isolate(batch)
+                    else:
+                        self._fail(batch, exc)
+                    return
+                await asyncio.sleep(self.flush_interval * 2 ** attempt)
+        self._resolve(batch, results)
+
+    async def _isolate(self, batch):
+        """Bisects a batch that keeps failing, so only the items that fail on their own are failed."""
+        middle = len(batch) // 2
+        for part in (batch[:middle], batch[middle:]):
+            try:
+                results = await self.handler([item for _, item, _ in part])
+            except Exception as exc:
+                self.failures += 1
+                if len(part) > 1:
+                    await self._isolate(part)
+                else:
+                    logger.exception("%s: giving up on an item that fails on its own: %r", self.name, part[0][1])
+                    self._fail(part, exc)
+                continue
+            self._resolve(part, results)
+
+    def _fail(self, batch, exc):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _resolve(self, batch, results):
+        now = time.perf_counter()
+        results = results if results is not None else [None] * len(batch)
+        for (enqueued_at, _, future), result in zip(batch, results):
+            self._latencies.append(now - enqueued_at)
+            if not future.done():
+                future.set_result(result)
+        self.batches += 1
+        self.items += len(batch)
+        self.last_batch_size = len(batch)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+        return {
+            "queued": self.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "latency_p50_ms": percentile(0.50),
+            "latency_p99_ms": percentile(0.99),
+        }
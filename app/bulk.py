@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import DateTime, delete, insert, literal, update
+from sqlmodel import Session, select
+
+from app.models import QuestionAssignment, Team, TeamAnswer, TeamArchive
+
+
+def set_team_status(session: Session, new_status: str, ids: Optional[List[int]] = None,
+                    current_status: Optional[str] = None) -> List[int]:
+    """One UPDATE ... RETURNING id over the matching teams.
+
+    Teams already in ``new_status`` are skipped so re-approving never resets
+    the clock of a team that is mid-quiz. Approval stamps ``start_time`` with
+    a single timestamp bound into the same statement.
+    """
+    statement = update(Team).where(Team.status != new_status)
+    if ids is not None:
+        statement = statement.where(Team.id.in_(ids))
+    if current_status is not None:
+        statement = statement.where(Team.status == current_status)
+    values = {"status": new_status}
+    if new_status == "approved":
+        values["start_time"] = datetime.now()
+    result = session.execute(statement.values(**values).returning(Team.id))
+    return [team_id for (team_id,) in result]
+
+
+def clear_teams(session: Session) -> int:
+    session.execute(delete(TeamAnswer))
+    session.execute(delete(QuestionAssignment))
+    return session.execute(delete(Team)).rowcount
+
+
+def archive_and_clear_teams(session: Session) -> int:
+    """Copies every team into TeamArchive with INSERT ... SELECT, then clears."""
+    columns = ["team_id", "name", "score", "start_time", "end_time", "time_taken_seconds",
+               "roll_number", "rc_number", "status", "archived_at"]
+    session.execute(insert(TeamArchive).from_select(columns, select(
+        Team.id, Team.name, Team.score, Team.start_time, Team.end_time, Team.time_taken_seconds,
+        Team.roll_number, Team.rc_number, Team.status, literal(datetime.now(), DateTime)
+    )))
+    return clear_teams(session)
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select, or_, and_
+
+from app.models import Question, Team
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COUNTERS_TTL = float(os.getenv("DASHBOARD_COUNTERS_TTL", "2"))
+
+
+def page_limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def questions_page(session: Session, after: Optional[int], limit: int):
+    """Keyset page of questions ordered by id. Returns (items, next cursor)."""
+    statement = select(Question).order_by(Question.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(Question.id > after)
+    questions = session.exec(statement).all()
+    items = [
+        {
+            "id": q.id,
+            "content_text": q.content_text,
+            "content_image": q.content_image,
+            "answer": q.answer,
+            "difficulty": q.difficulty,
+            "points": q.points,
+            "options": q.options,
+        }
+        for q in questions[:limit]
+    ]
+    next_cursor = str(questions[limit - 1].id) if len(questions) > limit else None
+    return items, next_cursor
+
+
+def _team_item(team: Team) -> dict:
+    return {
+        "id": team.id,
+        "name": team.name,
+        "roll_number": team.roll_number,
+        "rc_number": team.rc_number,
+        "score": team.score,
+        "time_taken_seconds": team.time_taken_seconds,
+        "status": team.status,
+    }
+
+
+def teams_page(session: Session, team_status: str, after: Optional[str], limit: int):
+    """Keyset page of teams in one status.
+
+    Approved teams are ranked by (score DESC, id ASC) and use a "score:id"
+    cursor; everything else is listed by id.
+    """
+    statement = select(Team).where(Team.status == team_status).limit(limit + 1)
+    if team_status == "approved":
+        statement = statement.order_by(Team.score.desc(), Team.id)
+        if after:
+            score, team_id = (int(part) for part in after.split(":", 1))
+            statement = statement.where(or_(
+                Team.score < score,
+                and_(Team.score == score, Team.id > team_id),
+            ))
+    else:
+        statement = statement.order_by(Team.id)
+        if after:
+            statement = statement.where(Team.id > int(after))
+    teams = session.exec(statement).all()
+
+    next_cursor = None
+    if len(teams) > limit:
+        last = teams[limit - 1]
+        next_cursor = f"{last.score}:{last.id}" if team_status == "approved" else str(last.id)
+    return [_team_item(team) for team in teams[:limit]], next_cursor
+
+
+class DashboardCounters:
+    """Team counters computed with one aggregate query and cached for a short TTL."""
+
+    def __init__(self, ttl: float = COUNTERS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+
+    def get(self, session: Session) -> dict:
+        now = time.monotonic()
+        if self._value is not None and now < self._expires:
+            return self._value
+        with self._lock:
+            if self._value is None or time.monotonic() >= self._expires:
+                finished = Team.end_time.is_not(None)
+                pending, approved, rejected, finished_count, average = session.exec(select(
+                    func.count(case((Team.status == "pending", 1))),
+                    func.count(case((Team.status == "approved", 1))),
+                    func.count(case((Team.status == "rejected", 1))),
+                    func.count(case((finished, 1))),
+                    func.avg(case((finished, Team.score))),
+                )).one()
+                self._value = {
+                    "pending": pending,
+                    "approved": approved,
+                    "rejected": rejected,
+                    "finished": finished_count,
+                    "average_score": round(float(average), 2) if average is not None else None,
+                }
+                self._expires = time.monotonic() + self.ttl
+            return self._value
+
+    def invalidate(self):
+        self._expires = 0.0
+
+
+counters = DashboardCounters()
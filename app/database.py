@@ -1,25 +1,131 @@
+import asyncio
 import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+from app.metrics import metrics
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool tuning (applies to both the sync and the async engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; Neon drops idle connections
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "2"))  # connections opened in the background after startup
+
+# Serverless: schema and the first admin are created once by `python init_db.py`, not on every cold start
+SKIP_DB_INIT = os.getenv("SKIP_DB_INIT", "false").lower() in ("1", "true", "yes")
+
+# SQLite production mode: WAL + busy timeout, and all writes go through app.writer
+SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "false").lower() in ("1", "true", "yes")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+
+def _async_postgres_url(url: str):
+    """Rewrites a psycopg2-style URL for asyncpg, which takes ssl via connect_args."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(url.query)
+    connect_args = {}
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = sslmode
+    if url.host and "-pooler" in url.host:
+        # PgBouncer in transaction mode can't keep asyncpg's prepared statements
+        connect_args["statement_cache_size"] = 0
+    return url.set(query=query), connect_args
+
 if DATABASE_URL:
     # PostgreSQL (Neon / Supabase / Render etc.)
     # Neon uses postgresql:// but SQLAlchemy needs postgresql+psycopg2://
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, pool_pre_ping=DB_POOL_PRE_PING, **pool_options)
+    async_url, async_connect_args = _async_postgres_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        async_url, connect_args=async_connect_args, pool_pre_ping=DB_POOL_PRE_PING, **pool_options
+    )
 else:
     # Local SQLite fallback
     sqlite_url = "sqlite:///puzzlemania.db"
-    engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
+    engine = create_engine(sqlite_url, connect_args={"check_same_thread": False}, **pool_options)
+    async_engine = create_async_engine("sqlite+aiosqlite:///puzzlemania.db", **pool_options)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+# Single connection used only by the serialized writer thread (see app/writer.py)
+write_engine = None
+
+if not DATABASE_URL and SQLITE_PRODUCTION:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+    write_engine = create_engine(
+        sqlite_url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0
+    )
+
+    @event.listens_for(write_engine, "connect")
+    def _writer_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work with pysqlite
+        dbapi_connection.isolation_level = None
+        _set_sqlite_pragmas(dbapi_connection, connection_record)
+
+    @event.listens_for(write_engine, "begin")
+    def _writer_begin(conn):
+        # Take the write lock up front instead of upgrading mid-transaction
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+# Query counts/latency and pool checkout waits for /metrics
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_engine.sync_engine, "async")
+if write_engine is not None:
+    metrics.instrument_engine(write_engine, "writer")
+
+# expire_on_commit=False: attribute access after commit must not trigger lazy IO in async code
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 def create_db_and_tables():
+    from app.migrations import run_migrations
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+
+def _prewarm_sync(size: int):
+    connections = [engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+async def prewarm_pool(size: int = DB_POOL_PREWARM):
+    """Opens ``size`` pooled connections per engine so early requests don't pay for connecting."""
+    async def connect_one():
+        async with async_engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+    await asyncio.gather(*(connect_one() for _ in range(size)))
+    await asyncio.to_thread(_prewarm_sync, size)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    async with async_session_maker() as session:
+        yield session
@@ -2,18 +2,31 @@ from fastapi import Request, Depends, HTTPException, status
 import os
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
-from app.database import get_session
+from app.database import engine
 from app.models import Admin
+from app.assets import asset_url
+from app.tokens import ADMIN_TOKEN_KEY, admin_cache, signer
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "app", "templates"))
+templates.env.globals["asset_url"] = asset_url
 
-def get_current_user(request: Request, session: Session = Depends(get_session)):
-    username = request.session.get("user")
+def get_current_user(request: Request):
+    # A valid admin token plus a cached Admin row means no DB round trip at all
+    claims = signer.admin_claims(request.session.get(ADMIN_TOKEN_KEY))
+    username = claims["username"] if claims else request.session.get("user")
     if not username:
         return None
-    statement = select(Admin).where(Admin.username == username)
-    user = session.exec(statement).first()
+    user = admin_cache.get(username)
+    if user is None:
+        with Session(engine) as session:
+            user = session.exec(select(Admin).where(Admin.username == username)).first()
+        if not user:
+            request.session.pop(ADMIN_TOKEN_KEY, None)
+            return None
+        admin_cache.put(username, user)
+    if claims is None:
+        request.session[ADMIN_TOKEN_KEY] = signer.issue_admin(user.id, user.username)
     return user
 
 def require_admin(request: Request, user: Admin = Depends(get_current_user)):
@@ -0,0 +1,123 @@
+import csv
+import importlib.util
+import io
+import json
+import tempfile
+from itertools import islice
+
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.leaderboard import format_time_taken
+from app.models import Team
+
+EXPORT_COLUMNS = ["Rank", "Team Name", "Roll Number", "RC Number", "Score", "Time Taken", "Start Time", "End Time"]
+CHUNK_ROWS = 500
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+class ExportUnavailable(Exception):
+    """The requested format needs an optional dependency that isn't installed."""
+
+
+def iter_leaderboard_rows():
+    """Yields ranked export rows straight from a server-side cursor."""
+    with Session(engine) as session:
+        result = session.exec(
+            select(
+                Team.name, Team.roll_number, Team.rc_number, Team.score,
+                Team.time_taken_seconds, Team.start_time, Team.end_time
+            )
+            .where(Team.status == "approved")
+            .order_by(Team.score.desc(), Team.time_taken_seconds.asc())
+            .execution_options(stream_results=True, yield_per=CHUNK_ROWS)
+        )
+        for rank, (name, roll, rc, score, seconds, start, end) in enumerate(result, start=1):
+            yield [rank, name, roll, rc, score, format_time_taken(seconds), start, end]
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _stream_file(file):
+    file.seek(0)
+    with file:
+        while True:
+            data = file.read(FILE_CHUNK_BYTES)
+            if not data:
+                return
+            yield data
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_jsonl(rows):
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in chunk
+        ).encode()
+
+
+def stream_xlsx(rows):
+    # Write-only mode streams rows to disk instead of building the sheet in memory
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Leaderboard")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    workbook.save(output)
+    yield from _stream_file(output)
+
+
+def stream_parquet(rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("Rank", pa.int64()), ("Team Name", pa.string()), ("Roll Number", pa.string()),
+        ("RC Number", pa.string()), ("Score", pa.int64()), ("Time Taken", pa.string()),
+        ("Start Time", pa.timestamp("us")), ("End Time", pa.timestamp("us")),
+    ])
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    with pq.ParquetWriter(output, schema) as writer:
+        # One row group per chunk keeps memory bounded by CHUNK_ROWS
+        for chunk in _chunks(rows):
+            writer.write_table(pa.Table.from_pylist([dict(zip(EXPORT_COLUMNS, row)) for row in chunk], schema=schema))
+    yield from _stream_file(output)
+
+
+# format -> (streamer, media type, file extension, optional module it needs)
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv", "csv", None),
+    "jsonl": (stream_jsonl, "application/x-ndjson", "jsonl", None),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx", "openpyxl"),
+    "parquet": (stream_parquet, "application/vnd.apache.parquet", "parquet", "pyarrow"),
+}
+
+
+def get_exporter(fmt: str):
+    """Returns (streamer, media type, extension), checked before any bytes are sent."""
+    streamer, media_type, extension, module = EXPORT_FORMATS[fmt]
+    if module and importlib.util.find_spec(module) is None:
+        raise ExportUnavailable(f"{fmt} export needs {module} (pip install {module})")
+    return streamer, media_type, extension
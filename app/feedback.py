@@ -0,0 +1,50 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.batching import BatchQueue
+from app.models import Feedback
+from app.writer import writer
+
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "200"))
+FEEDBACK_FLUSH_INTERVAL = int(os.getenv("FEEDBACK_FLUSH_INTERVAL_MS", "1000")) / 1000
+FEEDBACK_MAX_QUEUE = int(os.getenv("FEEDBACK_MAX_QUEUE", "2000"))  # pending rows before we answer 429
+MAX_FEEDBACK_LENGTH = 2000
+
+
+class FeedbackQueue:
+    """Write-behind buffer for anonymous feedback.
+
+    Requests only append to a bounded queue; a background task writes up to
+    FEEDBACK_BATCH_SIZE rows at a time with one multi-row INSERT. Feedback is
+    acknowledged before it is stored, so a burst after the result page costs
+    one connection and one commit per batch instead of per message, and never
+    queues up behind grading writes.
+    """
+
+    def __init__(self):
+        self.queue = BatchQueue(
+            "feedback", self._write_batch, FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL, maxsize=FEEDBACK_MAX_QUEUE
+        )
+
+    def enqueue(self, content: str):
+        """Raises batching.QueueFull when the buffer is at capacity."""
+        future = self.queue.put_nowait({"content": content[:MAX_FEEDBACK_LENGTH], "timestamp": datetime.now()})
+        # Nobody awaits the write; failures are already logged by the queue
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def _write_batch(self, rows):
+        await writer.run(lambda session: session.execute(insert(Feedback).values(rows)))
+
+    def start(self):
+        self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+
+    def stats(self) -> dict:
+        return self.queue.stats()
+
+
+feedback_queue = FeedbackQueue()
@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+from app.question_cache import MAX_ANSWER_LENGTH, QuestionSet, parse_question_id
+
+# numpy is imported on first use: it's a large share of cold start and only grading needs it
+
+
+@lru_cache(maxsize=4)
+def _key_arrays(question_set: QuestionSet):
+    """Answer key as sorted columnar arrays: (question ids, normalized answers, points)."""
+    import numpy as np
+
+    items = sorted((int(q_id), answer, points) for q_id, (answer, points) in question_set.answer_key.items())
+    if not items:
+        return np.array([], dtype=np.int64), np.array([], dtype=str), np.array([], dtype=np.int64)
+    ids, answers, points = zip(*items)
+    return np.array(ids, dtype=np.int64), np.array(answers, dtype=str), np.array(points, dtype=np.int64)
+
+
+def score_columns(team_ids, question_ids, answers, question_set: QuestionSet) -> dict:
+    """Scores every team in one vectorized pass.
+
+    The three inputs are parallel columns, one entry per (team, question)
+    answer. Returns {team_id: score} for every team that appears in them.
+    """
+    if len(team_ids) == 0:
+        return {}
+    import numpy as np
+
+    key_ids, key_answers, key_points = _key_arrays(question_set)
+    team_ids = np.asarray(team_ids, dtype=np.int64)
+    question_ids = np.asarray(question_ids, dtype=np.int64)
+    # Same normalization as normalize_answer(): strip + lowercase. The array is as wide as its
+    # longest answer times the row count, so rows stored before answers were capped are cut here too
+    answers = np.asarray([(answer or "")[:MAX_ANSWER_LENGTH] for answer in answers], dtype=str)
+    answers = np.char.lower(np.char.strip(answers))
+
+    if len(key_ids):
+        position = np.clip(np.searchsorted(key_ids, question_ids), 0, len(key_ids) - 1)
+        known = key_ids[position] == question_ids
+        correct = known & (answers != "") & (answers == key_answers[position])
+        points = np.where(correct, key_points[position], 0)
+    else:
+        points = np.zeros(len(team_ids), dtype=np.int64)
+
+    teams, team_index = np.unique(team_ids, return_inverse=True)
+    scores = np.bincount(team_index, weights=points, minlength=len(teams))
+    return dict(zip(teams.tolist(), scores.astype(np.int64).tolist()))
+
+
+def flatten_answers(submissions):
+    """[(team_id, {question_id: answer})] -> parallel columns, skipping malformed ids and cutting long answers."""
+    team_ids, question_ids, answers = [], [], []
+    for team_id, submitted in submissions:
+        for q_id, answer in submitted.items():
+            question_id = parse_question_id(q_id)
+            if question_id is None:
+                continue
+            team_ids.append(team_id)
+            question_ids.append(question_id)
+            answers.append((answer or "")[:MAX_ANSWER_LENGTH])
+    return team_ids, question_ids, answers
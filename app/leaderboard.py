@@ -0,0 +1,168 @@
+import threading
+import uuid
+from bisect import bisect_left
+
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import Team
+from app.pubsub import hub
+from app.responses import CachedPayload, dumps
+from app.state import shared_state
+
+LEADERBOARD_TOPIC = "leaderboard"
+
+
+def format_time_taken(seconds) -> str:
+    if seconds is None:
+        return "0s"
+    m = int(seconds // 60)
+    s = int(seconds % 60)
+    ms = int((seconds * 1000) % 1000)
+    return f"{m}m {s}s {ms}ms"
+
+
+def ranking_query():
+    return (
+        select(Team.id, Team.name, Team.score, Team.time_taken_seconds)
+        .where(Team.end_time.is_not(None))
+    )
+
+
+class Leaderboard:
+    """Ranked view of finished teams, kept sorted on (-score, time_taken, id).
+
+    Rebuilt from the DB at startup and updated incrementally as teams finish,
+    so /api/leaderboard never has to query or re-format anything. The JSON
+    payload is rendered once per change and tagged with a version for ETags.
+
+    Every change is also published on LEADERBOARD_TOPIC as a small delta
+    carrying the new version, so stream clients can patch their table in place.
+
+    Other workers replay finished teams from the shared-state broadcast and
+    rebuild from the DB after bulk changes; versions (and so ETags) are per
+    worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Random per-process epoch so ETags from a previous run never match
+        self._epoch = uuid.uuid4().hex[:8]
+        self._reset()
+
+    def _reset(self):
+        self._keys = []
+        self._rows = []
+        self._key_by_team = {}
+        self.version = 0
+        self._payload = None
+
+    @staticmethod
+    def _key(team_id: int, score: int, time_taken) -> tuple:
+        return (-score, time_taken if time_taken is not None else 0.0, team_id)
+
+    def _insert(self, team_id: int, name: str, score: int, time_taken):
+        """Returns (new index, previous index or None)."""
+        old_index = None
+        old_key = self._key_by_team.pop(team_id, None)
+        if old_key is not None:
+            old_index = bisect_left(self._keys, old_key)
+            del self._keys[old_index]
+            del self._rows[old_index]
+
+        key = self._key(team_id, score, time_taken)
+        index = bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._rows.insert(index, {
+            "name": name,
+            "score": score,
+            "time_taken": format_time_taken(time_taken),
+        })
+        self._key_by_team[team_id] = key
+        return index, old_index
+
+    def _publish(self, delta: dict):
+        # Called under the lock so subscribers see versions in order
+        hub.publish(LEADERBOARD_TOPIC, dumps(delta).decode())
+
+    def rebuild(self, session: Session):
+        """Reloads this worker's ranking from the DB."""
+        self._load(session.exec(ranking_query()).all())
+
+    def load(self, teams):
+        """Replaces the ranking with (id, name, score, time_taken_seconds) rows."""
+        self._load(teams)
+        shared_state.broadcast(LEADERBOARD_TOPIC, {"op": "rebuild"})
+
+    def _load(self, teams):
+        with self._lock:
+            version = self.version
+            self._reset()
+            for team_id, name, score, time_taken in teams:
+                self._insert(team_id, name, score, time_taken)
+            self.version = version + 1
+            self._publish({"type": "reset", "version": self.version})
+
+    def record(self, team_id: int, name: str, score: int, time_taken) -> int:
+        """Insert or move a finished team. Returns its 1-based rank."""
+        rank = self._record(team_id, name, score, time_taken)
+        shared_state.broadcast(LEADERBOARD_TOPIC, {"op": "record", "teams": [[team_id, name, score, time_taken]]})
+        return rank
+
+    def record_many(self, teams):
+        """record() for (id, name, score, time_taken_seconds) rows, with one broadcast."""
+        teams = [list(team) for team in teams]
+        for team in teams:
+            self._record(*team)
+        if teams:
+            shared_state.broadcast(LEADERBOARD_TOPIC, {"op": "record", "teams": teams})
+
+    def _record(self, team_id: int, name: str, score: int, time_taken) -> int:
+        with self._lock:
+            index, old_index = self._insert(team_id, name, score, time_taken)
+            self.version += 1
+            self._payload = None
+            self._publish({
+                "type": "insert",
+                "version": self.version,
+                "rank": index + 1,
+                "previous_rank": old_index + 1 if old_index is not None else None,
+                "row": self._rows[index],
+            })
+            return index + 1
+
+    def clear(self):
+        self._clear()
+        shared_state.broadcast(LEADERBOARD_TOPIC, {"op": "clear"})
+
+    def _clear(self):
+        with self._lock:
+            version = self.version
+            self._reset()
+            self.version = version + 1
+            self._publish({"type": "reset", "version": self.version})
+
+    def snapshot(self):
+        """Returns (version, CachedPayload) for the current ranking."""
+        with self._lock:
+            if self._payload is None:
+                # Replaced on every completion: max-level compression would rarely pay for itself
+                self._payload = CachedPayload(dumps(self._rows), f'"{self._epoch}-{self.version}"', fast=True)
+            return self.version, self._payload
+
+
+leaderboard = Leaderboard()
+
+
+def _on_remote_change(message):
+    if message is None or message["op"] == "rebuild":
+        with Session(engine) as session:
+            leaderboard.rebuild(session)
+    elif message["op"] == "record":
+        for team in message["teams"]:
+            leaderboard._record(*team)
+    elif message["op"] == "clear":
+        leaderboard._clear()
+
+
+shared_state.on(LEADERBOARD_TOPIC, _on_remote_change)
@@ -1,27 +1,74 @@
+import asyncio
+import importlib
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-import os
-from fastapi.staticfiles import StaticFiles
 from sqlmodel import Session
-from app.database import create_db_and_tables, engine
-from app.routers import auth, admin, game
+from app.database import SKIP_DB_INIT, create_db_and_tables, engine, async_engine, prewarm_pool
+from app.routers import auth, admin, game, metrics
 from app.routers.auth import create_initial_admin
+from app.leaderboard import leaderboard
+from app.writer import writer
+from app.submissions import submission_queue
+from app.progress import progress_buffer
+from app.feedback import feedback_queue
+from app.assets import AssetStaticFiles, STATIC_DIR
+from app.responses import CompressionMiddleware
+from app.metrics import MetricsMiddleware
+from app.tokens import SECRET_KEY, signer
+from app.state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Importing holds the GIL for a while; stay clear of the requests that woke the instance up
+GRADING_WARM_UP_DELAY = 2  # seconds
+
+async def warm_up():
+    """Runs after startup: fills the pool, then loads grading's numpy before the first submission needs it."""
+    try:
+        await prewarm_pool()
+        await asyncio.sleep(GRADING_WARM_UP_DELAY)
+        await asyncio.to_thread(importlib.import_module, "numpy")
+    except Exception:
+        logger.exception("warm-up failed; requests will connect on demand")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    if not SKIP_DB_INIT:
+        create_db_and_tables()
+    # Listen before reading state from the DB, so no other worker's change slips in between
+    shared_state.start()
+    signer.load_generation()
     with Session(engine) as session:
-        create_initial_admin(session)
+        if not SKIP_DB_INIT:
+            create_initial_admin(session)
+        leaderboard.rebuild(session)
+    if writer.enabled:
+        writer.start()
+    submission_queue.start()
+    progress_buffer.start()
+    feedback_queue.start()
+    warm_up_task = asyncio.get_running_loop().create_task(warm_up(), name="warm-up")
     yield
+    warm_up_task.cancel()
+    # Drain checkpoints, queued submissions, feedback and writes before the process exits
+    await progress_buffer.stop()
+    await submission_queue.stop()
+    await feedback_queue.stop()
+    writer.stop()
+    shared_state.stop()
+    await async_engine.dispose()
 
 from starlette.middleware.sessions import SessionMiddleware
 
 app = FastAPI(lifespan=lifespan)
-app.add_middleware(SessionMiddleware, secret_key="super-secret-puzzle-mania-key")
+app.add_middleware(MetricsMiddleware)  # innermost: needs the decoded session
+app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+app.add_middleware(CompressionMiddleware)
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
+app.mount("/static", AssetStaticFiles(directory=STATIC_DIR), name="static")
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(game.router)
+app.include_router(metrics.router)
 
@@ -0,0 +1,298 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+
+from sqlalchemy import event
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # bearer token for scrapers that can't log in
+METRICS_PROFILING = os.getenv("METRICS_PROFILING", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("METRICS_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_SAMPLES = int(os.getenv("METRICS_SLOW_QUERY_SAMPLES", "50"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+PREFIX = "puzzlemania_"
+
+# Query counter of the request being served; copied into threadpool calls with the context
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = PREFIX + name, help, tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_labels(self.labels, label_values)} {value:g}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = PREFIX + name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                labels = _labels((*self.labels, "le"), (*label_values, le))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {series[-1]:.6f}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge:
+    """Read at scrape time from a callback returning {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, collect, labels=()):
+        self.name, self.help, self.labels = PREFIX + name, help, tuple(labels)
+        self.collect = collect
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for label_values, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.labels, label_values)} {value:g}"
+
+
+class Metrics:
+    """Process-wide metrics: HTTP latency, DB queries, pool and threadpool usage."""
+
+    def __init__(self):
+        self.requests = Counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+        self.latency = Histogram("http_request_duration_seconds", "Time to first response byte.", ("method", "route"))
+        self.request_queries = Histogram(
+            "db_queries_per_request", "DB queries issued while serving one request.",
+            ("method", "route"), QUERY_COUNT_BUCKETS,
+        )
+        self.queries = Counter("db_queries_total", "DB queries, including background workers.", ("engine",))
+        self.query_latency = Histogram("db_query_duration_seconds", "DB query execution time.", ("engine",))
+        self.slow_queries = Counter("db_slow_queries_total", f"DB queries slower than {SLOW_QUERY_MS:g} ms.", ("engine",))
+        self.pool_wait = Histogram(
+            "db_pool_checkout_seconds", "Time spent waiting for a pooled connection.", ("engine",)
+        )
+        self.in_flight = 0
+        self.slow_samples = deque(maxlen=SLOW_QUERY_SAMPLES)
+        self._pools = {}
+        self._gauges = [
+            Gauge("http_requests_in_flight", "Requests being served right now.", lambda: {(): self.in_flight}),
+            Gauge("db_pool_connections", "Pooled connections by state.", self._pool_state, ("engine", "state")),
+        ]
+
+    def add_gauge(self, name: str, help: str, collect, labels=()):
+        self._gauges.append(Gauge(name, help, collect, labels))
+
+    def instrument_engine(self, engine, name: str):
+        """Counts and times every query on ``engine`` and times pool checkouts."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_started"].pop()
+            self.queries.inc(name)
+            self.query_latency.observe(elapsed, name)
+            counter = _request_queries.get()
+            if counter is not None:
+                counter[0] += 1
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                self.slow_queries.inc(name)
+                self.slow_samples.append({
+                    "engine": name,
+                    "ms": round(elapsed * 1000, 2),
+                    "route": counter[1] if counter is not None else None,
+                    "statement": statement[:500],
+                    "at": time.time(),
+                })
+
+        @event.listens_for(engine, "handle_error")
+        def failed_execute(context):
+            started = context.connection.info.get("query_started") if context.connection is not None else None
+            if started:
+                started.pop()
+
+        pool = engine.pool
+        self._pools[name] = pool
+        if hasattr(pool, "_do_get"):
+            # The pool has no event for "started waiting"; wrap the getter itself
+            do_get = pool._do_get
+
+            def timed_do_get():
+                started = time.perf_counter()
+                try:
+                    return do_get()
+                finally:
+                    self.pool_wait.observe(time.perf_counter() - started, name)
+
+            pool._do_get = timed_do_get
+
+    def _pool_state(self):
+        state = {}
+        for name, pool in self._pools.items():
+            if hasattr(pool, "checkedout"):
+                state[(name, "checked_out")] = pool.checkedout()
+                state[(name, "idle")] = pool.checkedin()
+                state[(name, "overflow")] = max(pool.overflow(), 0)
+                state[(name, "size")] = pool.size()
+        return state
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.latency, self.request_queries, self.queries,
+                       self.query_latency, self.slow_queries, self.pool_wait, *self._gauges):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "(unmatched)"  # 404s: don't let arbitrary paths become label values
+
+
+def profiling_allowed(scope) -> bool:
+    """Admin session or the metrics bearer token; checked without touching the DB."""
+    from app.tokens import ADMIN_TOKEN_KEY, signer
+
+    if METRICS_TOKEN:
+        for key, value in scope["headers"]:
+            if key == b"authorization" and value.decode("latin-1") == f"Bearer {METRICS_TOKEN}":
+                return True
+    session = scope.get("session") or {}
+    return signer.admin_claims(session.get(ADMIN_TOKEN_KEY)) is not None
+
+
+class MetricsMiddleware:
+    """Records latency, status and query count per route template.
+
+    Must sit inside SessionMiddleware so the profiling switch can see the
+    admin session. With METRICS_PROFILING on, an authorized request carrying
+    ``X-Profile: 1`` is answered with a profile of itself instead of its
+    normal body (pyinstrument's sampling profiler if installed, else cProfile).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if METRICS_PROFILING and (b"x-profile", b"1") in scope["headers"] and profiling_allowed(scope):
+            await self._profile(scope, receive, send)
+            return
+
+        counter = [0, scope["path"]]
+        token = _request_queries.set(counter)
+        started = time.perf_counter()
+        status_code = 500
+        first_byte = None
+
+        async def timed_send(message):
+            nonlocal status_code, first_byte
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                first_byte = time.perf_counter()
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            metrics.in_flight -= 1
+            _request_queries.reset(token)
+            route = _route_label(scope)
+            counter[1] = route
+            method = scope["method"]
+            metrics.requests.inc(method, route, str(status_code))
+            # Streams (SSE, exports) would skew a full-duration histogram; measure time to first byte
+            metrics.latency.observe((first_byte or time.perf_counter()) - started, method, route)
+            metrics.request_queries.observe(counter[0], method, route)
+
+    async def _profile(self, scope, receive, send):
+        async def discard(message):
+            pass
+
+        try:
+            from pyinstrument import Profiler  # optional, and only needed once someone asks for a profile
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+            body, content_type = profiler.output_html().encode(), b"text/html; charset=utf-8"
+        else:
+            # cProfile only sees the event loop thread: threadpool work shows up as waiting
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+            body, content_type = report.getvalue().encode(), b"text/plain; charset=utf-8"
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
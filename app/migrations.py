@@ -0,0 +1,55 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Ordered (version, name, statements). create_all() only creates missing
+# tables, so anything added to an existing table (indexes, columns) goes here.
+# Never edit a shipped migration; append a new one.
+MIGRATIONS = [
+    (1, "team_hot_path_indexes", [
+        # Dashboard pages and approve_all: WHERE status = ? ORDER BY id
+        "CREATE INDEX IF NOT EXISTS ix_team_status_id ON team (status, id)",
+        # Approved teams page and exports: WHERE status = 'approved' ORDER BY score DESC
+        "CREATE INDEX IF NOT EXISTS ix_team_status_score ON team (status, score DESC, id)",
+        # Leaderboard: finished teams only, ranked by score then time
+        "CREATE INDEX IF NOT EXISTS ix_team_finished_rank ON team (score DESC, time_taken_seconds, id) "
+        "WHERE end_time IS NOT NULL",
+    ]),
+]
+
+CREATE_MIGRATIONS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+)
+
+# Arbitrary key so concurrent workers on Postgres don't race each other
+_PG_LOCK_KEY = 7_318_001
+
+
+def applied_versions(connection) -> set:
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine) -> list:
+    """Applies pending migrations in order, one transaction each. Returns the versions applied."""
+    applied = []
+    with engine.begin() as connection:
+        connection.execute(text(CREATE_MIGRATIONS_TABLE))
+    for version, name, statements in MIGRATIONS:
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+            if version in applied_versions(connection):
+                continue
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :now)"),
+                {"version": version, "name": name, "now": datetime.now()},
+            )
+            logger.info("Applied migration %d_%s", version, name)
+            applied.append(version)
+    return applied
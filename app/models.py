@@ -3,6 +3,7 @@ from sqlmodel import Field, SQLModel
 from datetime import datetime
 
 class Team(SQLModel, table=True):
+    # Composite/partial indexes for the hot queries are created in app/migrations.py
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)
     score: int = Field(default=0)
@@ -13,6 +14,20 @@ class Team(SQLModel, table=True):
     rc_number: Optional[str] = Field(default=None)
     status: str = Field(default="pending")  # approved, rejected, pending
 
+class TeamArchive(SQLModel, table=True):
+    # Snapshot of a Team row taken by archive-then-clear
+    id: Optional[int] = Field(default=None, primary_key=True)
+    team_id: int
+    name: str
+    score: int = Field(default=0)
+    start_time: Optional[datetime] = Field(default=None)
+    end_time: Optional[datetime] = Field(default=None)
+    time_taken_seconds: Optional[float] = Field(default=None)
+    roll_number: Optional[str] = Field(default=None)
+    rc_number: Optional[str] = Field(default=None)
+    status: str
+    archived_at: datetime
+
 class Question(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     content_text: Optional[str] = Field(default=None)
@@ -22,6 +37,22 @@ class Question(SQLModel, table=True):
     points: int
     options: Optional[str] = Field(default=None)  # "A|B|C|D" for MCQ
 
+class TeamAnswer(SQLModel, table=True):
+    # Raw per-question answers, kept so teams can be re-graded after a key fix
+    team_id: int = Field(primary_key=True)
+    question_id: int = Field(primary_key=True)
+    answer: str
+
+class QuestionAssignment(SQLModel, table=True):
+    # Per-team question subset drawn at approval (app/assembly.py)
+    team_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    question_ids: bytes  # packed little-endian uint32 ids, in the order they are served
+
+class StateCounter(SQLModel, table=True):
+    # Named counters that must survive restarts, e.g. the token revocation generation (app/tokens.py)
+    key: str = Field(primary_key=True)
+    value: int = 0
+
 class Admin(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(unique=True, index=True)
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
+from app.assembly import assignments_enabled, unpack_ids
+from app.models import Question, QuestionAssignment, Team, TeamAnswer
+from app.question_cache import MAX_ANSWER_LENGTH, parse_question_id
+from app.writer import writer
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FLUSH_INTERVAL = int(os.getenv("PROGRESS_FLUSH_INTERVAL_MS", "2000")) / 1000
+PROGRESS_MAX_TEAMS = int(os.getenv("PROGRESS_MAX_TEAMS", "5000"))  # unflushed teams before we push back
+PROGRESS_MAX_RETRIES = 3  # failed flushes in a row before falling back to one write per team
+LIVE_PROGRESS_TTL = float(os.getenv("LIVE_PROGRESS_TTL", "2"))
+
+
+class ProgressFull(Exception):
+    pass
+
+
+def upsert_answers(session, rows):
+    """INSERT ... ON CONFLICT (team_id, question_id) DO UPDATE for TeamAnswer rows."""
+    if not rows:
+        return
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(TeamAnswer)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["team_id", "question_id"],
+        set_={"answer": statement.excluded.answer},
+    ), rows)
+
+
+class ProgressBuffer:
+    """Coalesces quiz answer deltas in memory and checkpoints them in batches.
+
+    Every flush interval all dirty answers, for all teams, go out as one
+    upsert into TeamAnswer through the writer, so a keystroke costs a dict
+    update rather than a DB write. Answers of teams that already finished
+    are dropped; the grader owns those rows from then on. A batch that keeps
+    failing is written team by team, so one bad team can't stall the rest.
+    """
+
+    def __init__(self, flush_interval: float = PROGRESS_FLUSH_INTERVAL, max_teams: int = PROGRESS_MAX_TEAMS):
+        self.flush_interval = flush_interval
+        self.max_teams = max_teams
+        self._dirty = {}  # team_id -> {question_id: answer}
+        self._held = {}  # team_id -> answers travelling with a submission that isn't written yet
+        self._flush_lock = None
+        self._task = None
+        # Monitoring
+        self.flushes = 0
+        self.rows = 0
+        self.failures = 0
+        self.last_flush_ms = None
+        self._retries = 0
+
+    def record(self, team_id: int, answers: dict, known_ids=None) -> int:
+        """Buffers the answers whose ids parse (and are in ``known_ids``, if given); returns how many."""
+        changes = {}
+        for question_id, answer in answers.items():
+            parsed = parse_question_id(question_id)
+            if parsed is None or (known_ids is not None and str(parsed) not in known_ids):
+                continue
+            changes[str(parsed)] = str(answer)[:MAX_ANSWER_LENGTH]
+        if not changes:
+            return 0
+        if team_id not in self._dirty and len(self._dirty) >= self.max_teams:
+            raise ProgressFull()
+        self._dirty.setdefault(team_id, {}).update(changes)
+        return len(changes)
+
+    def pending(self, team_id: int) -> dict:
+        return {**self._held.get(team_id, {}), **self._dirty.get(team_id, {})}
+
+    def hold(self, team_id: int) -> dict:
+        """Takes the team's unflushed answers out of the flushes while its submission is graded."""
+        held = {**self._held.get(team_id, {}), **self._dirty.pop(team_id, {})}
+        self._held[team_id] = held
+        return dict(held)
+
+    def release(self, team_id: int):
+        """The submission is written: its answers are the grader's now."""
+        self._held.pop(team_id, None)
+
+    def restore(self, team_id: int, answers: dict):
+        """The submission failed: checkpoint what it carried so the team can resubmit from it."""
+        self._held.pop(team_id, None)
+        changes = {
+            str(question_id): str(answer)[:MAX_ANSWER_LENGTH] for question_id, answer in answers.items()
+            if parse_question_id(str(question_id)) is not None
+        }
+        self._dirty[team_id] = {**changes, **self._dirty.get(team_id, {})}
+
+    async def flush(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._dirty = self._dirty, {}
+            if not batch:
+                return
+            started = time.perf_counter()
+            try:
+                written = await self._write(batch)
+            except Exception:
+                self.failures += 1
+                self._retries += 1
+                logger.exception("progress: flush of %d team(s) failed", len(batch))
+                if self._retries <= PROGRESS_MAX_RETRIES:
+                    # Put the batch back under anything that arrived meanwhile
+                    for team_id, answers in batch.items():
+                        self._dirty[team_id] = {**answers, **self._dirty.get(team_id, {})}
+                    return
+                written = await self._write_each(batch)
+            self._retries = 0
+            self.flushes += 1
+            self.rows += written
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    async def _write(self, batch) -> int:
+        def write(session):
+            open_teams = set(session.exec(
+                select(Team.id).where(Team.id.in_(batch), Team.end_time.is_(None))
+            ).all())
+            rows = [
+                {"team_id": team_id, "question_id": int(question_id), "answer": answer}
+                for team_id, answers in batch.items() if team_id in open_teams
+                for question_id, answer in answers.items()
+            ]
+            upsert_answers(session, rows)
+            return len(rows)
+
+        return await writer.run(write)
+
+    async def _write_each(self, batch) -> int:
+        """Last resort for a batch that keeps failing: checkpoints of teams that still fail are dropped."""
+        written = 0
+        for team_id, answers in batch.items():
+            try:
+                written += await self._write({team_id: answers})
+            except Exception:
+                self.failures += 1
+                # The browser still has these answers and sends them all on submit
+                logger.exception("progress: dropped %d unsaved answer(s) of team %s", len(answers), team_id)
+        return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="progress-flush")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "dirty_teams": len(self._dirty),
+            "held_teams": len(self._held),
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "failures": self.failures,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+async def saved_answers(session, team_id: int) -> dict:
+    """Checkpointed answers of one team, including those not flushed yet."""
+    rows = (await session.exec(
+        select(TeamAnswer.question_id, TeamAnswer.answer).where(TeamAnswer.team_id == team_id)
+    )).all()
+    return {**{str(question_id): answer for question_id, answer in rows}, **progress_buffer.pending(team_id)}
+
+
+def answered_counts(session, after, limit: int):
+    """Keyset page of approved teams still playing: ([(team id, name, answered)], next cursor).
+
+    Only non-empty answers to questions still in the bank count, and with
+    per-team question sets only those in the team's own set, so ``answered``
+    never exceeds the number of questions the team was given.
+    """
+    statement = (
+        select(Team.id, Team.name)
+        .where(Team.status == "approved", Team.end_time.is_(None))
+        .order_by(Team.id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        statement = statement.where(Team.id > after)
+    teams = session.exec(statement).all()
+    page = teams[:limit]
+    next_cursor = str(page[-1][0]) if len(teams) > limit else None
+    if not page:
+        return [], None
+
+    team_ids = [team_id for team_id, _ in page]
+    # Answers to deleted questions don't count
+    known_answers = (
+        TeamAnswer.team_id.in_(team_ids),
+        TeamAnswer.answer != "",
+        TeamAnswer.question_id.in_(select(Question.id)),
+    )
+    if assignments_enabled():
+        assigned = {
+            team_id: set(unpack_ids(packed)) for team_id, packed in session.exec(
+                select(QuestionAssignment.team_id, QuestionAssignment.question_ids)
+                .where(QuestionAssignment.team_id.in_(team_ids))
+            ).all()
+        }
+        answered = defaultdict(int)
+        for team_id, question_id in session.exec(
+            select(TeamAnswer.team_id, TeamAnswer.question_id).where(*known_answers)
+        ).all():
+            if team_id not in assigned or question_id in assigned[team_id]:
+                answered[team_id] += 1
+    else:
+        answered = dict(session.exec(
+            select(TeamAnswer.team_id, func.count()).where(*known_answers).group_by(TeamAnswer.team_id)
+        ).all())
+    return [(team_id, name, answered.get(team_id, 0)) for team_id, name in page], next_cursor
+
+
+class LiveProgress:
+    """Pages of answered_counts() cached for a short TTL.
+
+    Every open dashboard polls the same few pages every few seconds; they
+    share one query per page and TTL instead of each running their own.
+    """
+
+    def __init__(self, ttl: float = LIVE_PROGRESS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pages = {}  # (after, limit) -> (expires, page)
+
+    def get(self, session, after, limit: int):
+        key = (after, limit)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None and time.monotonic() < cached[0]:
+                return cached[1]
+            page = answered_counts(session, after, limit)
+            if len(self._pages) >= 64:  # cursors move as teams finish; don't keep stale ones around
+                self._pages.clear()
+            self._pages[key] = (time.monotonic() + self.ttl, page)
+            return page
+
+
+progress_buffer = ProgressBuffer()
+live_progress = LiveProgress()
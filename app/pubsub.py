@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from app.state import shared_state
+
+
+class Hub:
+    """In-process pub/sub fan-out.
+
+    Subscribers are asyncio queues owned by the event loop that created them.
+    ``publish`` is safe to call from sync routes running in the threadpool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, topic: str):
+        queue = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[topic].add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topic: str, message) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # Loop already closed (subscriber went away mid-publish)
+                pass
+        return len(subscribers)
+
+    def subscriber_count(self, topic: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+
+hub = Hub()
+
+
+def team_status_topic(team_id: int) -> str:
+    return f"team-status:{team_id}"
+
+
+def submission_topic(team_id: int) -> str:
+    return f"submission:{team_id}"
+
+
+def publish_team_statuses(team_ids, status: str):
+    """Tells waiting rooms on every worker; one broadcast for the whole batch."""
+    team_ids = list(team_ids)
+    for team_id in team_ids:
+        hub.publish(team_status_topic(team_id), status)
+    if team_ids:
+        shared_state.broadcast("team-status", {"status": status, "teams": team_ids})
+
+
+def publish_team_status(team_id: int, status: str):
+    publish_team_statuses([team_id], status)
+
+
+def publish_graded(team_ids):
+    """Wakes result pages waiting on other workers for submissions graded here."""
+    team_ids = list(team_ids)
+    if team_ids:
+        shared_state.broadcast("graded", team_ids)
+
+
+def _on_remote_statuses(message):
+    if message is None:
+        return  # waiting rooms fall back to polling /api/status
+    for team_id in message["teams"]:
+        hub.publish(team_status_topic(team_id), message["status"])
+
+
+def _on_remote_graded(message):
+    for team_id in message or ():
+        hub.publish(submission_topic(team_id), True)
+
+
+shared_state.on("team-status", _on_remote_statuses)
+shared_state.on("graded", _on_remote_graded)
+
+
+def sse_event(data: str, event: str = None) -> str:
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    for line in data.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
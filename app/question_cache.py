@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import threading
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Question
+from app.responses import CachedPayload, dumps
+from app.state import shared_state
+from app.uploads import image_sources
+
+
+MAX_QUESTION_ID = 2**31 - 1  # TeamAnswer.question_id is a 32-bit column
+MAX_ANSWER_LENGTH = 500  # longer answers are cut before they are stored or graded
+
+
+def parse_question_id(value):
+    """Question id sent by a client as an int, or None if it isn't one.
+
+    Only plain ASCII digits count: ``int()`` alone also accepts " 3", "1_0"
+    and other Unicode digits, and ``str.isdigit()`` lets "²" through to an
+    ``int()`` that then raises.
+    """
+    if not isinstance(value, str) or not value.isascii() or not value.isdigit():
+        return None
+    question_id = int(value)
+    return question_id if question_id <= MAX_QUESTION_ID else None
+
+
+def normalize_answer(answer) -> str:
+    # Simple exact match, case insensitive
+    return answer.strip().lower() if answer else ""
+
+
+class QuestionSet:
+    """Immutable snapshot of the question table, ready to serve and grade."""
+
+    def __init__(self, generation: int, questions):
+        self.generation = generation
+        # Each question serialized once; per-team subsets are spliced from these
+        self._fragments = {}
+        for q in questions:
+            image, image_srcset = image_sources(q.content_image)
+            self._fragments[q.id] = dumps({
+                "id": q.id,
+                "content_text": q.content_text,
+                "content_image": image,
+                "content_image_srcset": image_srcset,
+                "difficulty": q.difficulty,
+                "points": q.points,
+                "options": q.options
+            })
+        body = b"[" + b",".join(self._fragments.values()) + b"]"
+        self.payload = CachedPayload(body, f'"{hashlib.sha1(body).hexdigest()}"')
+        # {question_id (str, as sent by the client): (normalized answer, points)}
+        self.answer_key = {str(q.id): (normalize_answer(q.answer), q.points) for q in questions}
+
+    def subset_body(self, question_ids) -> bytes:
+        """JSON array of the given questions in the given order; deleted ones are skipped."""
+        fragments = self._fragments
+        return b"[" + b",".join(fragments[q_id] for q_id in question_ids if q_id in fragments) + b"]"
+
+
+class QuestionCache:
+    """Process-wide cache of the current QuestionSet.
+
+    Admin edits call invalidate(), which bumps the generation; the next reader
+    rebuilds the set once while concurrent readers wait instead of all
+    querying at quiz start.
+    """
+
+    def __init__(self):
+        self._build_lock = asyncio.Lock()
+        self._generation_lock = threading.Lock()
+        self.generation = 0
+        self._current = None
+
+    async def get(self, session: AsyncSession) -> QuestionSet:
+        current = self._current
+        if current is not None and current.generation == self.generation:
+            return current
+        async with self._build_lock:
+            current = self._current
+            generation = self.generation
+            if current is None or current.generation != generation:
+                questions = (await session.exec(select(Question).order_by(Question.id))).all()
+                current = QuestionSet(generation, questions)
+                self._current = current
+            return current
+
+    def _bump(self):
+        # Called from sync admin routes in the threadpool and the state listener
+        with self._generation_lock:
+            self.generation += 1
+
+    def invalidate(self):
+        self._bump()
+        shared_state.broadcast("question-cache")
+
+
+question_cache = QuestionCache()
+shared_state.on("question-cache", lambda message: question_cache._bump())
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+LOGIN_LIMIT_PER_USER = int(os.getenv("LOGIN_LIMIT_PER_USER", "5"))
+LOGIN_LIMIT_PER_IP = int(os.getenv("LOGIN_LIMIT_PER_IP", "20"))
+LOGIN_LIMIT_WINDOW = float(os.getenv("LOGIN_LIMIT_WINDOW", "60"))  # seconds
+
+
+class SlidingWindowLimiter:
+    """Allows at most ``limit`` hits per key within the last ``window`` seconds.
+
+    Keys are kept in LRU order and capped at ``max_keys`` so a flood of
+    distinct usernames or addresses can't grow memory without bound.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 10_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key) -> float:
+        """Records a hit. Returns 0 if allowed, else seconds until the next one would be."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            self._hits.move_to_end(key)
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+            return 0.0
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+login_user_limiter = SlidingWindowLimiter(LOGIN_LIMIT_PER_USER, LOGIN_LIMIT_WINDOW)
+login_ip_limiter = SlidingWindowLimiter(LOGIN_LIMIT_PER_IP, LOGIN_LIMIT_WINDOW)
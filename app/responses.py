@@ -0,0 +1,185 @@
+import asyncio
+import gzip
+import os
+import threading
+import zlib
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/x-ndjson", "image/svg+xml")
+# Never compressed by the middleware: SSE must reach the client event by event
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj)
+
+
+def accepted_encoding(request_headers) -> str:
+    """The best encoding the client accepts: "br", "gzip" or ""."""
+    accepted = request_headers.get("accept-encoding", "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+_COMPRESS = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+    "br": lambda body: brotli.compress(body, quality=11),
+}
+_COMPRESS_FAST = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    "br": lambda body: brotli.compress(body, quality=BROTLI_QUALITY),
+}
+
+
+class CachedPayload:
+    """A pre-serialized JSON body and its ETag.
+
+    Compressed variants are built at maximum level on first use and kept,
+    so every later request for the same version just sends bytes. Payloads
+    served to a single client or replaced often (``fast=True``) use the
+    streaming levels instead, since the expensive compression would never
+    be paid back. Either way it runs in a worker thread, off the event loop.
+    """
+
+    def __init__(self, body: bytes, etag: str, fast: bool = False):
+        self.body = body
+        self.etag = etag
+        self._compress = _COMPRESS_FAST if fast else _COMPRESS
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        if not encoding:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = self._compress[encoding](self.body)
+        return data
+
+    async def encoded_async(self, encoding: str) -> bytes:
+        if not encoding:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = await asyncio.to_thread(self.encoded, encoding)
+        return data
+
+
+async def cached_response(request: Request, payload: CachedPayload) -> Response:
+    """Serves a CachedPayload with ETag revalidation and its precompressed bytes."""
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers=headers)
+    encoding = accepted_encoding(request.headers) if len(payload.body) >= COMPRESSION_MINIMUM_SIZE else ""
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(await payload.encoded_async(encoding), media_type="application/json", headers=headers)
+
+
+class _Encoder:
+    """Incremental gzip/brotli encoder; each chunk is flushed so streams stay streams."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """Brotli/gzip compression for text responses above a size threshold.
+
+    Responses that already carry a Content-Encoding (precompressed payloads
+    and static files) and event streams are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or content_type.startswith(UNCOMPRESSED_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message  # held until we see the first body chunk
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    body = encoder.chunk(body)
+                else:
+                    body = encoder.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+            else:
+                body = encoder.chunk(body) if more_body else encoder.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,169 +1,273 @@
-import shutil
-import uuid
-import io
+import time
 from datetime import datetime
-from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-import pandas as pd
-from fastapi import APIRouter, Request, Form, File, UploadFile, Depends, status
-from fastapi.responses import RedirectResponse, StreamingResponse
-from sqlmodel import Session, select
+from fastapi import APIRouter, Request, Form, File, UploadFile, Depends, Query, status
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
-from app.models import Question, Team
-from app.dependencies import templates, get_current_user
-
-import os
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-UPLOAD_DIR = Path(os.path.join(BASE_DIR, "static", "img", "uploads"))
-try:
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-except OSError:
-    pass
+from app.database import get_session, get_async_session
+from app.models import Question, Team, TeamAnswer
 from app.dependencies import templates, get_current_user
+from app.pubsub import publish_team_status, publish_team_statuses
+from app.leaderboard import leaderboard, ranking_query
+from app.grading import score_columns
+from app.export import EXPORT_FORMATS, ExportUnavailable, get_exporter, iter_leaderboard_rows
+from app.question_cache import question_cache
+from app.writer import writer
+from app.submissions import submission_queue
+from app.bulk import set_team_status, clear_teams, archive_and_clear_teams
+from app.dashboard import counters, page_limit, questions_page, teams_page
+from app.uploads import save_upload
+from app.tokens import signer
+from app.progress import live_progress, progress_buffer
+from app.assembly import QUIZ_QUESTIONS_PER_TEAM, assign_questions, assigned_ids, assignments_enabled, team_question_sets
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/dashboard")
-def dashboard(request: Request, user = Depends(get_current_user), session: Session = Depends(get_session)):
+def dashboard(request: Request, user = Depends(get_current_user)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-    
-    questions = session.exec(select(Question)).all()
-    # Only show approved teams in leaderboard on dashboard (or all, but maybe separate pending)
-    teams = session.exec(select(Team).where(Team.status == "approved").order_by(Team.score.desc())).all()
-    pending_teams = session.exec(select(Team).where(Team.status == "pending")).all()
-    
+
+    # Sections are loaded lazily by static/js/admin.js from the /admin/api endpoints
     return templates.TemplateResponse("admin/dashboard.html", {
         "request": request, 
-        "user": user, 
-        "questions": questions,
-        "teams": teams,
-        "pending_teams": pending_teams
+        "user": user
     })
 
-@router.get("/export/csv") # Keeping URL simple, returning excel
-def export_leaderboard(session: Session = Depends(get_session)):
-    import pandas as pd
-    from io import BytesIO
-    from fastapi.responses import StreamingResponse
-    
-    # Fetch all approved teams sorted by rank
-    teams = session.exec(select(Team).where(Team.status == "approved").order_by(Team.score.desc(), Team.time_taken_seconds.asc())).all()
-    
-    data = []
-    for i, team in enumerate(teams):
-        time_str = "0s"
-        if team.time_taken_seconds:
-            m = int(team.time_taken_seconds // 60)
-            s = int(team.time_taken_seconds % 60)
-            ms = int((team.time_taken_seconds * 1000) % 1000)
-            time_str = f"{m}m {s}s {ms}ms"
-            
-        data.append({
-            "Rank": i + 1,
-            "Team Name": team.name,
-            "Roll Number": team.roll_number,
-            "RC Number": team.rc_number,
-            "Score": team.score,
-            "Time Taken": time_str,
-            "Start Time": team.start_time,
-            "End Time": team.end_time
-        })
-        
-    df = pd.DataFrame(data)
-    
-    # Create Excel buffer
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Leaderboard')
-        
-    buffer.seek(0)
-    
-    headers = {
-        'Content-Disposition': 'attachment; filename="puzzlemania_leaderboard.xlsx"'
-    }
-    
-    return StreamingResponse(buffer, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+@router.get("/api/counters")
+def dashboard_counters(user = Depends(get_current_user), session: Session = Depends(get_session)):
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return JSONResponse(counters.get(session))
+
+@router.get("/api/questions")
+def list_questions(
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    user = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    items, next_cursor = questions_page(session, after, page_limit(limit))
+    return JSONResponse({"items": items, "next": next_cursor})
+
+@router.get("/api/teams")
+def list_teams(
+    team_status: str = Query("approved", alias="status"),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    user = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    try:
+        items, next_cursor = teams_page(session, team_status, after, page_limit(limit))
+    except ValueError:
+        return JSONResponse({"error": "Invalid cursor"}, status_code=400)
+    return JSONResponse({"items": items, "next": next_cursor})
+
+@router.get("/api/submissions/stats")
+def submission_stats(user = Depends(get_current_user)):
+    """Submission queue health: batch sizes, flush interval, enqueue-to-commit latency."""
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return JSONResponse(submission_queue.stats())
+
+def _questions_per_team(bank_size: int) -> int:
+    return min(bank_size, QUIZ_QUESTIONS_PER_TEAM) if assignments_enabled() else bank_size
+
+@router.get("/api/progress")
+def live_progress_page(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    user = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """Questions answered per team still playing, as of the last checkpoint flush; paged by team id."""
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    try:
+        items, next_cursor = live_progress.get(session, int(after) if after else None, page_limit(limit))
+    except ValueError:
+        return JSONResponse({"error": "Invalid cursor"}, status_code=400)
+    return JSONResponse({
+        "total_questions": _questions_per_team(session.exec(select(func.count(Question.id))).one()),
+        "items": [{"id": team_id, "name": name, "answered": answered} for team_id, name, answered in items],
+        "next": next_cursor,
+        "buffer": progress_buffer.stats(),
+    })
 
 @router.get("/team/approve/{team_id}")
 def approve_team(team_id: int, user = Depends(get_current_user), session: Session = Depends(get_session)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-        
-    team = session.get(Team, team_id)
-    if team:
-        team.status = "approved"
-        team.start_time = datetime.now() # Reset start time to approval time
-        session.add(team)
-        session.commit()
+
+    def approve(write_session):
+        team = write_session.get(Team, team_id)
+        if team:
+            reapproved = team.status == "approved"
+            team.status = "approved"
+            team.start_time = datetime.now() # Reset start time to approval time
+            write_session.add(team)
+            return assign_questions(write_session, [team_id]), reapproved
+        return None, False
+
+    drawn, reapproved = writer.run_sync(approve, session=session)
+    if reapproved:
+        # Re-approval moves start_time, which existing player tokens carry
+        signer.revoke_all()
+    if drawn is not None:
+        team_question_sets.remember(drawn)
+        publish_team_status(team_id, "approved")
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/team/reject/{team_id}")
 def reject_team(team_id: int, user = Depends(get_current_user), session: Session = Depends(get_session)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-        
-    team = session.get(Team, team_id)
-    if team:
-        team.status = "rejected"
-        session.add(team)
-        session.commit()
+
+    def reject(write_session):
+        team = write_session.get(Team, team_id)
+        if team:
+            team.status = "rejected"
+            write_session.add(team)
+        return team is not None
+
+    if writer.run_sync(reject, session=session):
+        signer.revoke_all()
+        publish_team_status(team_id, "rejected")
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/team/approve_all")
 def approve_all_teams(user = Depends(get_current_user), session: Session = Depends(get_session)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-    
-    pending_teams = session.exec(select(Team).where(Team.status == "pending")).all()
-    for team in pending_teams:
-        team.status = "approved"
-        team.start_time = datetime.now()
-        session.add(team)
-    session.commit()
+
+    def approve_all(write_session):
+        team_ids = set_team_status(write_session, "approved", current_status="pending")
+        return team_ids, assign_questions(write_session, team_ids)
+
+    approved_ids, drawn = writer.run_sync(approve_all, session=session)
+    team_question_sets.remember(drawn)
+    publish_team_statuses(approved_ids, "approved")
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
+class BulkTeamAction(SQLModel):
+    ids: Optional[List[int]] = None  # explicit team ids
+    status: Optional[str] = None  # or: every team currently in this status
+
+def _bulk_result(affected: int, started: float):
+    return JSONResponse({"affected": affected, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+def _bulk_set_status(new_status: str, action: BulkTeamAction, session: Session):
+    started = time.perf_counter()
+    current_status = action.status
+    if action.ids is None and current_status is None:
+        current_status = "pending"
+    def set_status(write_session):
+        team_ids = set_team_status(write_session, new_status, action.ids, current_status)
+        drawn = assign_questions(write_session, team_ids) if new_status == "approved" else {}
+        return team_ids, drawn
+
+    team_ids, drawn = writer.run_sync(set_status, session=session)
+    team_question_sets.remember(drawn)
+    if team_ids and new_status == "rejected":
+        signer.revoke_all()
+    publish_team_statuses(team_ids, new_status)
+    return _bulk_result(len(team_ids), started)
+
+@router.post("/api/teams/approve")
+def bulk_approve_teams(action: BulkTeamAction, user = Depends(get_current_user), session: Session = Depends(get_session)):
+    """Approve by id list or by current status (default: all pending) in one UPDATE."""
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return _bulk_set_status("approved", action, session)
+
+@router.post("/api/teams/reject")
+def bulk_reject_teams(action: BulkTeamAction, user = Depends(get_current_user), session: Session = Depends(get_session)):
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return _bulk_set_status("rejected", action, session)
+
+@router.post("/api/teams/clear")
+def bulk_clear_teams(user = Depends(get_current_user), session: Session = Depends(get_session)):
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    started = time.perf_counter()
+    affected = writer.run_sync(clear_teams, session=session)
+    leaderboard.clear()
+    signer.revoke_all()
+    return _bulk_result(affected, started)
+
+@router.post("/api/teams/archive")
+def bulk_archive_teams(user = Depends(get_current_user), session: Session = Depends(get_session)):
+    """Copy all teams into TeamArchive, then clear them."""
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    started = time.perf_counter()
+    affected = writer.run_sync(archive_and_clear_teams, session=session)
+    leaderboard.clear()
+    signer.revoke_all()
+    return _bulk_result(affected, started)
+
+@router.get("/regrade")
+async def regrade_all(user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    """Re-scores every finished team from its stored answers against the current key."""
+    if not user:
+        return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
+
+    question_set = await question_cache.get(session)
+    answers = (await session.exec(
+        select(TeamAnswer.team_id, TeamAnswer.question_id, TeamAnswer.answer)
+        .join(Team, Team.id == TeamAnswer.team_id)
+        .where(Team.end_time.is_not(None))
+    )).all()
+    if assignments_enabled():
+        assigned = await assigned_ids(session, {team_id for team_id, _, _ in answers})
+        finished = {team_id for team_id, _, _ in answers}
+        answers = [
+            (team_id, question_id, answer) for team_id, question_id, answer in answers
+            if team_id not in assigned or question_id in assigned[team_id]
+        ]
+        # A team left with no counted answers still gets its score reset
+        scores = dict.fromkeys(finished, 0)
+    else:
+        scores = {}
+    if answers:
+        scores.update(score_columns(*zip(*answers), question_set))
+
+    def write(write_session):
+        if scores:
+            write_session.execute(update(Team), [
+                {"id": team_id, "score": score} for team_id, score in scores.items()
+            ])
+        return write_session.exec(ranking_query()).all()
+
+    leaderboard.load(await writer.run(write, session=session))
+    return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
+
+@router.get("/export/csv") # Legacy URL, same exporter
 @router.get("/leaderboard/export")
-def export_leaderboard(user = Depends(get_current_user), session: Session = Depends(get_session)):
+def export_leaderboard(fmt: str = Query("xlsx", alias="format"), user = Depends(get_current_user)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-        
-    teams = session.exec(select(Team).where(Team.status == "approved").order_by(Team.score.desc())).all()
-    
-    data = []
-    for i, t in enumerate(teams):
-        time_str = "0s"
-        if t.time_taken_seconds is not None:
-            m = int(t.time_taken_seconds // 60)
-            s = int(t.time_taken_seconds % 60)
-            ms = int((t.time_taken_seconds * 1000) % 1000)
-            time_str = f"{m}m {s}s {ms}ms"
-            
-        data.append({
-            "Rank": i + 1,
-            "Team Name": t.name,
-            "Roll Number": t.roll_number,
-            "RC Number": t.rc_number,
-            "Score": t.score,
-            "Time Taken": time_str,
-            "Start Time": t.start_time,
-            "End Time": t.end_time
-        })
-        
-    df = pd.DataFrame(data)
-    
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Leaderboard')
-        
-    output.seek(0)
-    
+    if fmt not in EXPORT_FORMATS:
+        return JSONResponse({"error": f"Unknown format. Use one of: {', '.join(EXPORT_FORMATS)}"}, status_code=400)
+    try:
+        streamer, media_type, extension = get_exporter(fmt)
+    except ExportUnavailable as exc:
+        return JSONResponse({"error": str(exc)}, status_code=501)
+
     headers = {
-        'Content-Disposition': 'attachment; filename="leaderboard_export.xlsx"'
+        'Content-Disposition': f'attachment; filename="puzzlemania_leaderboard.{extension}"'
     }
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(streamer(iter_leaderboard_rows()), headers=headers, media_type=media_type)
 
 @router.post("/question/add")
 async def add_question(
@@ -174,26 +278,14 @@ async def add_question(
     image_file: UploadFile = File(None),
     options: str = Form(None),
     user = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    # Handle Image Upload
     image_path = None
     if image_file and image_file.filename:
-        # Generate unique filename
-        file_extension = Path(image_file.filename).suffix
-        if not file_extension:
-            file_extension = ".png" # Default fallback
-            
-        new_filename = f"{uuid.uuid4().hex}{file_extension}"
-        file_path = UPLOAD_DIR / new_filename
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image_file.file, buffer)
-            
-        image_path = f"/static/img/uploads/{new_filename}"
+        image_path = await save_upload(image_file)
 
     # Auto-assign points
     if difficulty == "Easy":
@@ -211,19 +303,20 @@ async def add_question(
         points=points,
         options=options
     )
-    session.add(question)
-    session.commit()
+    await writer.run(lambda write_session: write_session.add(question), session=session)
+    question_cache.invalidate()
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/question/delete/{q_id}")
-def delete_question(q_id: int, user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def delete_question(q_id: int, user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     if not user:
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-    
-    question = session.get(Question, q_id)
-    if question:
-        session.delete(question)
-        session.commit()
+
+    def delete_one(write_session):
+        return write_session.execute(delete(Question).where(Question.id == q_id)).rowcount
+
+    if await writer.run(delete_one, session=session):
+        question_cache.invalidate()
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/leaderboard/clear")
@@ -232,9 +325,8 @@ def clear_leaderboard(user = Depends(get_current_user), session: Session = Depen
         return RedirectResponse("/auth/login", status_code=status.HTTP_303_SEE_OTHER)
     
     # Delete all teams
-    teams = session.exec(select(Team)).all()
-    for team in teams:
-        session.delete(team)
-    session.commit()
+    writer.run_sync(clear_teams, session=session)
+    leaderboard.clear()
+    signer.revoke_all()
     
     return RedirectResponse("/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
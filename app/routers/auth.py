@@ -1,27 +1,83 @@
+import asyncio
+import functools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Request, Form, Depends, status
 from fastapi.responses import RedirectResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from passlib.context import CryptContext
-from app.database import get_session
+from app.database import get_async_session
 from app.models import Admin
 from app.dependencies import templates
+from app.tokens import ADMIN_TOKEN_KEY, admin_cache, signer
+from app.ratelimit import login_user_limiter, login_ip_limiter
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+# Cost of new hashes; existing hashes keep verifying with the rounds they were made with
+AUTH_PBKDF2_ROUNDS = int(os.getenv("AUTH_PBKDF2_ROUNDS", "29000"))
+# Hashing runs on its own small pool so login bursts can't starve the request threadpool
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+AUTH_MAX_PENDING = int(os.getenv("AUTH_MAX_PENDING", "16"))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__default_rounds=AUTH_PBKDF2_ROUNDS
+)
+_hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
+_pending_verifications = 0
+
+@functools.cache
+def _dummy_hash() -> str:
+    # Verified when the username doesn't exist, so timing doesn't reveal valid usernames.
+    # Made on first use in the hash pool: hashing at import time slowed every cold start
+    return pwd_context.hash("not-a-real-password")
+
+def _verify(password: str, password_hash) -> bool:
+    return pwd_context.verify(password, password_hash if password_hash is not None else _dummy_hash())
+
+async def verify_password(password: str, password_hash) -> bool:
+    """``password_hash`` None checks against a dummy hash, for usernames that don't exist."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, _verify, password, password_hash)
+
+def _login_error(request: Request, error: str, status_code: int = 200, retry_after: float = 0):
+    headers = {"Retry-After": str(math.ceil(retry_after))} if retry_after else None
+    return templates.TemplateResponse(
+        "admin/login.html", {"request": request, "error": error}, status_code=status_code, headers=headers
+    )
 
 @router.get("/login")
 def login_page(request: Request):
     return templates.TemplateResponse("admin/login.html", {"request": request})
 
 @router.post("/login")
-def login(request: Request, username: str = Form(...), password: str = Form(...), session: Session = Depends(get_session)):
-    statement = select(Admin).where(Admin.username == username)
-    user = session.exec(statement).first()
-    
-    if not user or not pwd_context.verify(password, user.password_hash):
-        return templates.TemplateResponse("admin/login.html", {"request": request, "error": "Invalid credentials"})
-    
+async def login(request: Request, username: str = Form(...), password: str = Form(...), session: AsyncSession = Depends(get_async_session)):
+    global _pending_verifications
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = max(login_user_limiter.hit(username), login_ip_limiter.hit(client_ip))
+    if retry_after:
+        return _login_error(request, f"Too many login attempts. Try again in {math.ceil(retry_after)}s.",
+                            status.HTTP_429_TOO_MANY_REQUESTS, retry_after)
+    if _pending_verifications >= AUTH_MAX_PENDING:
+        return _login_error(request, "Login is busy, try again in a moment.",
+                            status.HTTP_503_SERVICE_UNAVAILABLE, 1)
+
+    user = (await session.exec(select(Admin).where(Admin.username == username))).first()
+    _pending_verifications += 1
+    try:
+        valid = await verify_password(password, user.password_hash if user else None)
+    finally:
+        _pending_verifications -= 1
+
+    if not user or not valid:
+        return _login_error(request, "Invalid credentials")
+
+    login_user_limiter.reset(username)
     request.session["user"] = user.username
+    request.session[ADMIN_TOKEN_KEY] = signer.issue_admin(user.id, user.username)
+    admin_cache.put(user.username, user)
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/logout")
@@ -1,13 +1,31 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict
 from fastapi import APIRouter, Request, Form, Depends, status, Body
-from fastapi.responses import RedirectResponse, JSONResponse
-from sqlmodel import Session, select, SQLModel
-from app.database import get_session
-from app.models import Question, Team, Feedback
+from fastapi.responses import RedirectResponse, ORJSONResponse, StreamingResponse
+from sqlmodel import select, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session, async_session_maker
+from app.models import Team
 from app.dependencies import templates
+from app.pubsub import hub, team_status_topic, submission_topic, sse_event
+from app.leaderboard import leaderboard, format_time_taken, LEADERBOARD_TOPIC
+from app.question_cache import MAX_ANSWER_LENGTH, parse_question_id, question_cache
+from app.writer import writer
+from app.submissions import submission_queue
+from app.responses import cached_response, dumps
+from app.tokens import PLAYER_TOKEN_KEY, signer
+from app.progress import ProgressFull, progress_buffer, saved_answers
+from app.state import shared_state
+from app.batching import QueueFull
+from app.feedback import feedback_queue
+from app.assembly import assignments_enabled, team_question_sets
 
-router = APIRouter(tags=["Game"])
+router = APIRouter(tags=["Game"], default_response_class=ORJSONResponse)
+
+STREAM_KEEPALIVE = 15  # seconds between SSE comments to keep proxies from timing out
+FINAL_STATUSES = {"approved", "rejected", "unknown"}
+REMOTE_GRADING_WAIT = 5  # seconds a result page waits for a submission graded on another worker
 
 class FeedbackInput(SQLModel):
     content: str
@@ -18,67 +36,65 @@ def health_check():
     return {"status": "ok"}
 
 @router.post("/api/feedback")
-def submit_feedback(data: FeedbackInput, session: Session = Depends(get_session)):
-    feedback_entry = Feedback(content=data.content)
-    session.add(feedback_entry)
-    session.commit()
-    return JSONResponse({"success": True})
+async def submit_feedback(data: FeedbackInput):
+    # Stored by the feedback queue's next batch; answered before the write
+    try:
+        feedback_queue.enqueue(data.content)
+    except QueueFull:
+        return ORJSONResponse({"error": "Busy, retry shortly"}, status_code=429, headers={"Retry-After": "2"})
+    return ORJSONResponse({"success": True})
 
 @router.get("/")
 def landing_page(request: Request):
     request.session.pop("team_id", None)
+    request.session.pop(PLAYER_TOKEN_KEY, None)
     return templates.TemplateResponse("game/index.html", {"request": request})
 
 @router.post("/start")
-def start_game(
+async def start_game(
     request: Request, 
     team_name: str = Form(...), 
     roll_number: str = Form(...),
-    rc_number: str = Form(...),
-    session: Session = Depends(get_session)
+    rc_number: str = Form(...)
 ):
-    # Check if team exists
-    existing_team = session.exec(select(Team).where(Team.name == team_name)).first()
-    if existing_team:
-        # If rejected, reset and allow re-application
-        if existing_team.status == "rejected":
-            existing_team.status = "pending"
-            existing_team.roll_number = roll_number
-            existing_team.rc_number = rc_number
-            existing_team.start_time = datetime.now()
-            session.add(existing_team)
-            session.commit()
-            session.refresh(existing_team)
-            request.session["team_id"] = existing_team.id
-            return RedirectResponse(f"/waiting/{existing_team.id}", status_code=status.HTTP_303_SEE_OTHER)
-            
-        # If approved, go to quiz
-        if existing_team.status == "approved":
-            request.session["team_id"] = existing_team.id
-            return RedirectResponse("/quiz", status_code=status.HTTP_303_SEE_OTHER)
-            
-        # If pending, go to waiting
-        request.session["team_id"] = existing_team.id
-        return RedirectResponse(f"/waiting/{existing_team.id}", status_code=status.HTTP_303_SEE_OTHER)
-    
-    # Create new team
-    new_team = Team(
-        name=team_name, 
-        roll_number=roll_number,
-        rc_number=rc_number,
-        status="pending",
-        start_time=datetime.now()
-    )
-    session.add(new_team)
-    session.commit()
-    session.refresh(new_team)
-    
-    request.session["team_id"] = new_team.id
-    return RedirectResponse(f"/waiting/{new_team.id}", status_code=status.HTTP_303_SEE_OTHER)
+    def register(session):
+        # Check if team exists
+        existing_team = session.exec(select(Team).where(Team.name == team_name)).first()
+        if existing_team:
+            # If rejected, reset and allow re-application
+            if existing_team.status == "rejected":
+                existing_team.status = "pending"
+                existing_team.roll_number = roll_number
+                existing_team.rc_number = rc_number
+                existing_team.start_time = datetime.now()
+                session.add(existing_team)
+            return existing_team.id, existing_team.status
+
+        # Create new team
+        new_team = Team(
+            name=team_name, 
+            roll_number=roll_number,
+            rc_number=rc_number,
+            status="pending",
+            start_time=datetime.now()
+        )
+        session.add(new_team)
+        session.flush()
+        return new_team.id, new_team.status
+
+    team_id, team_status = await writer.run(register)
+    request.session["team_id"] = team_id
+
+    # If approved, go to quiz
+    if team_status == "approved":
+        return RedirectResponse("/quiz", status_code=status.HTTP_303_SEE_OTHER)
+
+    # If pending, go to waiting
+    return RedirectResponse(f"/waiting/{team_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/waiting/{team_id}")
-def waiting_page(request: Request, team_id: int, session: Session = Depends(get_session)):
-    team = session.get(Team, team_id)
+async def waiting_page(request: Request, team_id: int, session: AsyncSession = Depends(get_async_session)):
+    team = await session.get(Team, team_id)
     if not team:
         return RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
         
@@ -88,101 +104,178 @@ def waiting_page(request: Request, team_id: int, session: Session = Depends(get_
     return templates.TemplateResponse("game/waiting.html", {"request": request, "team": team})
 
 @router.get("/api/status/{team_id}")
-def check_status(team_id: int, session: Session = Depends(get_session)):
-    team = session.get(Team, team_id)
+async def check_status(team_id: int, session: AsyncSession = Depends(get_async_session)):
+    team = await session.get(Team, team_id)
     if not team:
-        return JSONResponse({"status": "unknown"})
-    return JSONResponse({"status": team.status})
+        return ORJSONResponse({"status": "unknown"})
+    return ORJSONResponse({"status": team.status})
+
+async def _read_team_status(team_id: int) -> str:
+    # Short-lived session: the stream itself must not pin a pooled connection
+    async with async_session_maker() as session:
+        team = await session.get(Team, team_id)
+        return team.status if team else "unknown"
+
+@router.get("/api/status/{team_id}/stream")
+async def stream_status(request: Request, team_id: int):
+    """Server-sent events: pushes the team's status once now and again on every change."""
+    async def event_stream():
+        with hub.subscribe(team_status_topic(team_id)) as queue:
+            # Subscribe before reading so an approval between the two is not lost
+            current = await _read_team_status(team_id)
+            yield sse_event(dumps({"status": current}).decode())
+            while current not in FINAL_STATUSES:
+                try:
+                    current = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event(dumps({"status": current}).decode())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 @router.get("/quiz")
-def quiz_page(request: Request, session: Session = Depends(get_session)):
+async def quiz_page(request: Request, session: AsyncSession = Depends(get_async_session)):
     team_id = request.session.get("team_id")
     if not team_id:
         return RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
-    
-    team = session.get(Team, team_id)
-    if not team or team.end_time:
+    if submission_queue.is_pending(team_id):
         return RedirectResponse("/result", status_code=status.HTTP_303_SEE_OTHER)
+
+    # The player token proves the team is approved and unfinished; only without one do we ask the DB
+    claims = signer.player_claims(request.session.get(PLAYER_TOKEN_KEY), team_id)
+    if claims:
+        start_time = claims["start"]
+    else:
+        team = await session.get(Team, team_id)
+        if not team or team.end_time:
+            return RedirectResponse("/result", status_code=status.HTTP_303_SEE_OTHER)
+        if team.status == "approved":
+            request.session[PLAYER_TOKEN_KEY] = signer.issue_player(team.id, team.name, team.start_time)
+        start_time = team.start_time
     
     # Calculate initial time remaining
     now = datetime.now()
     duration = 20 * 60 # 20 minutes in seconds
-    elapsed = (now - team.start_time).total_seconds()
+    elapsed = (now - start_time).total_seconds()
     remaining = max(0, duration - elapsed)
     
     return templates.TemplateResponse("game/quiz.html", {
         "request": request,
-        "team": team,
         "remaining_seconds": int(remaining)
     })
 
 @router.get("/api/questions")
-def get_questions(session: Session = Depends(get_session)):
-    questions = session.exec(select(Question)).all()
-    # Filter out answers obviously
-    return [
-        {
-            "id": q.id,
-            "content_text": q.content_text,
-            "content_image": q.content_image,
-            "difficulty": q.difficulty,
-            "points": q.points,
-            "options": q.options
-        }
-        for q in questions
-    ]
+async def get_questions(request: Request, session: AsyncSession = Depends(get_async_session)):
+    # Answers are stripped when the cached payload is built
+    question_set = await question_cache.get(session)
+    if not assignments_enabled():
+        return await cached_response(request, question_set.payload)
+    team_id = request.session.get("team_id")
+    if not team_id:
+        return ORJSONResponse({"error": "Not authenticated"}, status_code=401)
+    # Serving a team its set may draw and store one: only for teams actually playing
+    if not signer.player_claims(request.session.get(PLAYER_TOKEN_KEY), team_id):
+        team = await session.get(Team, team_id)
+        if not team or team.end_time or team.status != "approved":
+            return ORJSONResponse({"error": "Not playing"}, status_code=403)
+    return await cached_response(request, await team_question_sets.payload(session, question_set, team_id))
+
+@router.get("/api/progress")
+async def get_progress(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Checkpointed answers of the session's team, used to restore a quiz on a new device."""
+    team_id = request.session.get("team_id")
+    if not team_id:
+        return ORJSONResponse({"error": "Not authenticated"}, status_code=401)
+    return await saved_answers(session, team_id)
+
+@router.post("/api/progress")
+async def save_progress(
+    request: Request,
+    answers: Dict[str, str] = Body(...), # changed answers only: {question_id: answer}
+    session: AsyncSession = Depends(get_async_session)
+):
+    team_id = request.session.get("team_id")
+    if not team_id:
+        return ORJSONResponse({"error": "Not authenticated"}, status_code=401)
+    if submission_queue.is_pending(team_id):
+        return ORJSONResponse({"error": "Already submitted"}, status_code=409)
+    if not signer.player_claims(request.session.get(PLAYER_TOKEN_KEY), team_id):
+        team = await session.get(Team, team_id)
+        if not team or team.end_time or team.status != "approved":
+            return ORJSONResponse({"error": "Not playing"}, status_code=409)
+
+    # Only ids in the current bank are buffered; the rest would just be noise in TeamAnswer
+    question_set = await question_cache.get(session)
+    try:
+        saved = progress_buffer.record(team_id, answers, question_set.answer_key)
+    except ProgressFull:
+        return ORJSONResponse({"error": "Busy, retry shortly"}, status_code=429, headers={"Retry-After": "2"})
+    return {"saved": saved}
 
 @router.post("/api/submit")
-def submit_quiz(
+async def submit_quiz(
     request: Request,
     answers: Dict[str, str] = Body(...), # {question_id: answer}
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     team_id = request.session.get("team_id")
     if not team_id:
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        return ORJSONResponse({"error": "Not authenticated"}, status_code=401)
         
-    team = session.get(Team, team_id)
-    if not team or team.end_time:
-        return JSONResponse({"message": "Already submitted"}, status_code=200)
-
-    # Calculate Score
-    score = 0
-    questions = session.exec(select(Question)).all()
-    q_map = {str(q.id): q for q in questions}
-    
-    for q_id, user_answer in answers.items():
-        if q_id in q_map:
-            q = q_map[q_id]
-            # Simple exact match, case insensitive
-            if user_answer and user_answer.strip().lower() == q.answer.strip().lower():
-                score += q.points
-                
-    team.score = score
-    team.end_time = datetime.now()
-    team.time_taken_seconds = (team.end_time - team.start_time).total_seconds()
-    
-    session.add(team)
-    session.commit()
-    
-    return JSONResponse({"redirect": "/result"})
+    # Stamp the finish time now; grading and the DB write happen in the batch worker
+    end_time = datetime.now()
+    if submission_queue.is_pending(team_id):
+        return ORJSONResponse({"message": "Already submitted"}, status_code=200)
+    # Graded in a batch with other teams: a malformed key must not get that far
+    if any(parse_question_id(q_id) is None for q_id in answers):
+        return ORJSONResponse({"error": "Invalid question id"}, status_code=400)
+
+    if not signer.player_claims(request.session.get(PLAYER_TOKEN_KEY), team_id):
+        team = await session.get(Team, team_id)
+        if not team or team.end_time:
+            return ORJSONResponse({"message": "Already submitted"}, status_code=200)
+
+    answers = {q_id: answer[:MAX_ANSWER_LENGTH] for q_id, answer in answers.items()}
+    submission_queue.enqueue(team_id, answers, end_time)
+    # The token only stands for an unfinished team; the grader also skips finished ones
+    request.session.pop(PLAYER_TOKEN_KEY, None)
+    return ORJSONResponse({"redirect": "/result"})
+
+async def _wait_for_remote_grading(session: AsyncSession, team: Team) -> Team:
+    # The submission may have landed on another worker; its grader broadcasts once written
+    with hub.subscribe(submission_topic(team.id)) as queue:
+        await session.refresh(team)
+        if team.end_time is None:
+            try:
+                await asyncio.wait_for(queue.get(), REMOTE_GRADING_WAIT)
+            except asyncio.TimeoutError:
+                pass
+            await session.refresh(team)
+    return team
 
 @router.get("/result")
-def result_page(request: Request, session: Session = Depends(get_session)):
+async def result_page(request: Request, session: AsyncSession = Depends(get_async_session)):
     team_id = request.session.get("team_id")
-    team = session.get(Team, team_id) if team_id else None
+    if team_id:
+        await submission_queue.wait(team_id)
+    team = await session.get(Team, team_id) if team_id else None
+    if team and team.end_time is None and team.status == "approved" and shared_state.distributed:
+        team = await _wait_for_remote_grading(session, team)
     
-    time_formatted = "0s"
-    if team and team.time_taken_seconds is not None:
-        m = int(team.time_taken_seconds // 60)
-        s = int(team.time_taken_seconds % 60)
-        ms = int((team.time_taken_seconds * 1000) % 1000)
-        time_formatted = f"{m}m {s}s {ms}ms"
+    time_formatted = format_time_taken(team.time_taken_seconds if team else None)
     
     return templates.TemplateResponse("game/result.html", {
         "request": request, 
         "team": team,
-        "time_formatted": time_formatted
+        "time_formatted": time_formatted,
+        # Its answers are back in the progress buffer; /quiz restores them for another try
+        "submission_failed": bool(team and team.end_time is None and submission_queue.failed(team.id)),
     })
 
 @router.get("/leaderboard")
@@ -190,21 +283,29 @@ def leaderboard_page(request: Request):
     return templates.TemplateResponse("game/leaderboard.html", {"request": request})
 
 @router.get("/api/leaderboard")
-def leaderboard_data(session: Session = Depends(get_session)):
-    teams = session.exec(
-        select(Team)
-        .where(Team.end_time.is_not(None))
-        .order_by(Team.score.desc(), Team.time_taken_seconds.asc())
-    ).all()
-    return [
-        {
-            "name": t.name,
-            "score": t.score,
-            "time_taken": (
-                f"{int(t.time_taken_seconds // 60)}m "
-                f"{int(t.time_taken_seconds % 60)}s "
-                f"{int((t.time_taken_seconds * 1000) % 1000)}ms"
-            )
-        }
-        for t in teams
-    ]
+async def leaderboard_data(request: Request):
+    # Served from the in-memory ranking; unchanged polls get a bodyless 304
+    _, payload = leaderboard.snapshot()
+    return await cached_response(request, payload)
+
+@router.get("/api/leaderboard/stream")
+async def stream_leaderboard(request: Request):
+    """Server-sent events: a full snapshot on connect, then one delta per rank change."""
+    async def event_stream():
+        with hub.subscribe(LEADERBOARD_TOPIC) as queue:
+            version, payload = leaderboard.snapshot()
+            yield sse_event(f'{{"version": {version}, "rows": {payload.body.decode()}}}', event="snapshot")
+            while True:
+                try:
+                    delta = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event(delta)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
@@ -0,0 +1,45 @@
+import anyio.to_thread
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.dependencies import get_current_user
+from app.metrics import METRICS_TOKEN, metrics
+from app.feedback import feedback_queue
+from app.progress import progress_buffer
+from app.routers import auth
+from app.submissions import submission_queue
+from app.writer import writer
+
+router = APIRouter(tags=["Metrics"])
+
+def _threadpool():
+    # Saturation of the pool running sync endpoints and dependencies
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {("busy",): limiter.borrowed_tokens, ("capacity",): limiter.total_tokens}
+
+metrics.add_gauge("threadpool_threads", "Request threadpool threads by state.", _threadpool, ("state",))
+metrics.add_gauge("queue_depth", "Work waiting in background queues.", lambda: {
+    ("submissions",): submission_queue.queue.qsize(),
+    ("feedback",): feedback_queue.queue.qsize(),
+    ("progress_teams",): progress_buffer.stats()["dirty_teams"],
+    ("writer",): writer.qsize(),
+    ("login_hashing",): auth._pending_verifications,
+}, ("queue",))
+
+def _authorized(request: Request, user) -> bool:
+    if user:
+        return True
+    return bool(METRICS_TOKEN) and request.headers.get("authorization") == f"Bearer {METRICS_TOKEN}"
+
+@router.get("/metrics")
+async def metrics_endpoint(request: Request, user = Depends(get_current_user)):
+    """Prometheus text format. Admin session, or `Authorization: Bearer $METRICS_TOKEN` for scrapers."""
+    if not _authorized(request, user):
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/slow-queries")
+def slow_queries(request: Request, user = Depends(get_current_user)):
+    """Most recent queries slower than METRICS_SLOW_QUERY_MS, newest first."""
+    if not _authorized(request, user):
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    return JSONResponse(list(reversed(metrics.slow_samples)))
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# redis://host:6379/0 to share state between workers/instances; unset = single process
+STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL") or os.getenv("REDIS_URL")
+STATE_PREFIX = os.getenv("STATE_PREFIX", "puzzlemania")
+
+
+class MemoryBackend:
+    """Shared state for a single process: there is nobody else to tell.
+
+    ``broadcast`` reaches the handlers registered on *other* workers only;
+    the caller has already applied the change locally. A handler receiving
+    ``None`` must resync from the source of truth, because messages may have
+    been missed (the networked backend lost its connection).
+    """
+
+    distributed = False
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+
+    def on(self, channel: str, handler):
+        self._handlers[channel].append(handler)
+
+    def _dispatch(self, channel: str, message):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(message)
+            except Exception:
+                logger.exception("state: handler for %r failed", channel)
+
+    def _resync(self):
+        for channel in list(self._handlers):
+            self._dispatch(channel, None)
+
+    def broadcast(self, channel: str, message=True):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class RedisBackend(MemoryBackend):
+    """Redis pub/sub fan-out between every worker.
+
+    One listener thread per process receives the other workers' broadcasts
+    and calls the local handlers, which must therefore be thread-safe.
+    """
+
+    distributed = True
+
+    def __init__(self, url: str, prefix: str = STATE_PREFIX):
+        # Imported here: optional, and a noticeable share of cold start when unused
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND_URL is set but the redis package is not installed")
+        super().__init__()
+        self._errors = redis.RedisError
+        self.prefix = prefix
+        self.worker_id = uuid.uuid4().hex
+        self._client = redis.Redis.from_url(url)
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def broadcast(self, channel: str, message=True):
+        try:
+            payload = orjson.dumps({"origin": self.worker_id, "message": message})
+            self._client.publish(self._key(channel), payload)
+        except (self._errors, TypeError):  # orjson.JSONEncodeError is a TypeError
+            # Others resync when their listener reconnects; losing the broadcast beats failing the request
+            logger.exception("state: broadcast on %r failed", channel)
+
+    def _subscribe(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self._key("*"))
+        return pubsub
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            # Subscribed before returning, so startup's reads from the DB can't miss a broadcast
+            pubsub = self._subscribe()
+            self._thread = threading.Thread(target=self._listen, args=(pubsub,), name="state-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen(self, pubsub):
+        prefix = self._key("")
+        while not self._stopping.is_set():
+            try:
+                if pubsub is None:
+                    pubsub = self._subscribe()
+                    # Subscribed again; whatever was published meanwhile is lost
+                    self._resync()
+                message = pubsub.get_message(timeout=1.0)
+            except self._errors:
+                logger.exception("state: lost connection to the state backend")
+                if pubsub is not None:
+                    pubsub.close()
+                pubsub = None
+                time.sleep(1)
+                continue
+            if message is None or message["type"] != "pmessage":
+                continue
+            data = orjson.loads(message["data"])
+            if data["origin"] != self.worker_id:
+                self._dispatch(message["channel"].decode()[len(prefix):], data["message"])
+        if pubsub is not None:
+            pubsub.close()
+
+
+def create_backend(url=STATE_BACKEND_URL):
+    if not url:
+        return MemoryBackend()
+    return RedisBackend(url)
+
+
+shared_state = create_backend()
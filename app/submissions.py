@@ -0,0 +1,148 @@
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.assembly import assigned_ids, only_assigned
+from app.batching import BatchQueue
+from app.database import async_session_maker
+from app.grading import flatten_answers, score_columns
+from app.leaderboard import leaderboard
+from app.models import Team, TeamAnswer
+from app.progress import progress_buffer, upsert_answers
+from app.pubsub import publish_graded
+from app.question_cache import question_cache
+from app.writer import writer
+
+SUBMIT_BATCH_SIZE = int(os.getenv("SUBMIT_BATCH_SIZE", "100"))
+SUBMIT_FLUSH_INTERVAL = int(os.getenv("SUBMIT_FLUSH_INTERVAL_MS", "50")) / 1000
+
+
+class SubmissionQueue:
+    """Accepts quiz submissions immediately and grades them in batches.
+
+    ``end_time`` is stamped when the request arrives, so queueing never
+    inflates a team's time. Each batch is graded against the cached answer key
+    and written with one bulk UPDATE, one bulk upsert of the raw answers and
+    one commit. Answers checkpointed through /api/progress are merged under
+    the submitted ones, so a team that lost its browser state is still
+    graded on everything it saved.
+
+    The team is answered before its batch is written. If the batch can't be
+    written, its answers go back into the progress buffer and the failure is
+    remembered, so /result can send the team back to submit again.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._failed = set()
+        self.queue = BatchQueue("submissions", self._grade_batch, SUBMIT_BATCH_SIZE, SUBMIT_FLUSH_INTERVAL)
+
+    def is_pending(self, team_id: int) -> bool:
+        return team_id in self._pending
+
+    def failed(self, team_id: int) -> bool:
+        """True if the team's last submission could not be written."""
+        return team_id in self._failed
+
+    def enqueue(self, team_id: int, answers: dict, end_time: datetime) -> bool:
+        """Returns False if this team already has a submission in flight."""
+        if team_id in self._pending:
+            return False
+        # Unflushed checkpoints travel with the submission; flushed ones are merged by the grader
+        answers = {**progress_buffer.hold(team_id), **answers}
+        self._failed.discard(team_id)
+        future = self.queue.put_nowait((team_id, answers, end_time))
+        self._pending[team_id] = future
+        future.add_done_callback(lambda done: self._finished(team_id, answers, done))
+        return True
+
+    def _finished(self, team_id: int, answers: dict, future):
+        self._pending.pop(team_id, None)
+        if future.cancelled() or future.exception() is not None:
+            self._failed.add(team_id)
+            progress_buffer.restore(team_id, answers)
+        else:
+            progress_buffer.release(team_id)
+
+    async def wait(self, team_id: int, timeout: float = 5.0):
+        """Waits until the team's queued submission (if any) has been written."""
+        future = self._pending.get(team_id)
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+            except Exception:
+                # Timed out or the batch failed; the caller reads whatever is in the DB
+                pass
+
+    async def _grade_batch(self, items):
+        async with async_session_maker() as session:
+            question_set = await question_cache.get(session)
+            checkpoints = (await session.exec(
+                select(TeamAnswer.team_id, TeamAnswer.question_id, TeamAnswer.answer)
+                .where(TeamAnswer.team_id.in_([team_id for team_id, _, _ in items]))
+            )).all()
+            assigned = await assigned_ids(session, [team_id for team_id, _, _ in items])
+        # Checkpointed progress fills in anything the final submission is missing;
+        # only the team's assigned questions count
+        saved = {}
+        for team_id, question_id, answer in checkpoints:
+            saved.setdefault(team_id, {})[str(question_id)] = answer
+        columns = flatten_answers(
+            (team_id, only_assigned({**saved.get(team_id, {}), **answers}, assigned.get(team_id)))
+            for team_id, answers, _ in items
+        )
+        scores = score_columns(*columns, question_set)
+        graded = {team_id: (scores.get(team_id, 0), end_time) for team_id, _, end_time in items}
+
+        def write(session):
+            teams = session.exec(
+                select(Team.id, Team.name, Team.start_time)
+                .where(Team.id.in_(graded), Team.end_time.is_(None))
+            ).all()
+            rows = []
+            for team_id, name, start_time in teams:
+                score, end_time = graded[team_id]
+                rows.append({
+                    "id": team_id,
+                    "name": name,
+                    "score": score,
+                    "end_time": end_time,
+                    "time_taken_seconds": (end_time - start_time).total_seconds(),
+                })
+            if rows:
+                # ORM bulk UPDATE by primary key: a single executemany statement
+                session.execute(update(Team), [
+                    {key: row[key] for key in ("id", "score", "end_time", "time_taken_seconds")}
+                    for row in rows
+                ])
+                written = {row["id"] for row in rows}
+                answer_rows = [
+                    {"team_id": team_id, "question_id": question_id, "answer": answer}
+                    for team_id, question_id, answer in zip(*columns)
+                    if team_id in written
+                ]
+                upsert_answers(session, answer_rows)
+            return rows
+
+        rows = await writer.run(write)
+        leaderboard.record_many(
+            (row["id"], row["name"], row["score"], row["time_taken_seconds"]) for row in rows
+        )
+        written = {row["id"] for row in rows}
+        publish_graded(written)
+        return [team_id in written for team_id, _, _ in items]
+
+    def start(self):
+        self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+
+    def stats(self) -> dict:
+        return self.queue.stats()
+
+
+submission_queue = SubmissionQueue()
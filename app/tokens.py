@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import StateCounter
+from app.state import shared_state
+from app.writer import writer
+
+SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-puzzle-mania-key")
+PLAYER_TOKEN_MAX_AGE = int(os.getenv("PLAYER_TOKEN_MAX_AGE", str(3 * 3600)))  # seconds
+ADMIN_TOKEN_MAX_AGE = int(os.getenv("ADMIN_TOKEN_MAX_AGE", str(12 * 3600)))
+ADMIN_CACHE_SIZE = int(os.getenv("ADMIN_CACHE_SIZE", "32"))
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "60"))
+
+# Keys inside the (already signed) Starlette session cookie
+PLAYER_TOKEN_KEY = "player_token"
+ADMIN_TOKEN_KEY = "admin_token"
+# StateCounter row holding the revocation generation
+TOKEN_GENERATION_KEY = "token-generation"
+
+
+def _bump_generation(session) -> int:
+    """Increments the revocation generation in the DB and returns the new value."""
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(StateCounter).values(key=TOKEN_GENERATION_KEY, value=1)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["key"], set_={"value": StateCounter.value + 1}
+    ))
+    return session.execute(select(StateCounter.value).where(StateCounter.key == TOKEN_GENERATION_KEY)).scalar_one()
+
+
+class TokenSigner:
+    """Signed, expiring tokens carrying facts that never change once issued.
+
+    A player token is issued once a team is approved (id, name, start time);
+    an admin token at login (id, username, role). Both carry the current
+    revocation generation: revoke_all() bumps it, which turns every token
+    issued before into a miss, and the caller falls back to the database and
+    issues a fresh one. The generation is a counter in the database, so it
+    survives restarts (tokens revoked by a clear stay revoked even after SQLite
+    hands their team ids out again) and every worker agrees on it.
+    """
+
+    def __init__(self, secret_key: str):
+        self._player = URLSafeTimedSerializer(secret_key, salt="player")
+        self._admin = URLSafeTimedSerializer(secret_key, salt="admin")
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def _advance(self, generation: int):
+        with self._lock:
+            self.generation = max(self.generation, generation)
+
+    def load_generation(self):
+        with Session(engine) as session:
+            counter = session.get(StateCounter, TOKEN_GENERATION_KEY)
+        self._advance(counter.value if counter is not None else 0)
+
+    def revoke_all(self):
+        """Must not be called from inside a writer job: it runs one of its own."""
+        generation = writer.run_sync(_bump_generation)
+        self._advance(generation)
+        shared_state.broadcast("tokens", generation)
+
+    def _load(self, serializer, token, max_age) -> Optional[dict]:
+        if not token:
+            return None
+        try:
+            claims = serializer.loads(token, max_age=max_age)
+        except BadSignature:  # also covers SignatureExpired
+            return None
+        return claims if claims.get("gen") == self.generation else None
+
+    def issue_player(self, team_id: int, name: str, start_time: datetime) -> str:
+        return self._player.dumps({
+            "team_id": team_id,
+            "name": name,
+            "start": start_time.timestamp(),
+            "gen": self.generation,
+        })
+
+    def player_claims(self, token, team_id) -> Optional[dict]:
+        """Claims of a valid token for this team, with "start" as a datetime."""
+        claims = self._load(self._player, token, PLAYER_TOKEN_MAX_AGE)
+        if claims is None or claims["team_id"] != team_id:
+            return None
+        return {**claims, "start": datetime.fromtimestamp(claims["start"])}
+
+    def issue_admin(self, admin_id: int, username: str) -> str:
+        return self._admin.dumps({"admin_id": admin_id, "username": username, "role": "admin", "gen": self.generation})
+
+    def admin_claims(self, token) -> Optional[dict]:
+        return self._load(self._admin, token, ADMIN_TOKEN_MAX_AGE)
+
+
+class TTLCache:
+    """Small LRU whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if time.monotonic() >= expires:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+signer = TokenSigner(SECRET_KEY)
+shared_state.on("tokens", lambda generation: signer.load_generation() if generation is None else signer._advance(generation))
+admin_cache = TTLCache(ADMIN_CACHE_SIZE, ADMIN_CACHE_TTL)
@@ -0,0 +1,136 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import aiofiles
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+UPLOAD_DIR = BASE_DIR / "static" / "img" / "uploads"
+UPLOAD_URL = "/static/img/uploads"
+CHUNK_BYTES = 256 * 1024
+
+# Resized variants generated next to each upload as <stem>-<width>.<format>
+VARIANT_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "480,960").split(","))
+VARIANT_FORMATS = {"avif": ("image/avif", 55), "webp": ("image/webp", 80)}  # format -> (mime, quality)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+
+async def save_upload(upload: UploadFile) -> str:
+    """Streams an upload to disk under its content hash and returns its URL.
+
+    Identical files end up under the same name, so re-uploading an image
+    reuses the stored file (and its variants) instead of adding a copy.
+    """
+    extension = Path(upload.filename or "").suffix.lower() or ".png"
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while chunk := await upload.read(CHUNK_BYTES):
+                digest.update(chunk)
+                await out.write(chunk)
+        path = UPLOAD_DIR / f"{digest.hexdigest()[:32]}{extension}"
+        if path.exists():
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            os.remove(temp_path)
+        raise
+    schedule_variants(path)
+    return f"{UPLOAD_URL}/{path.name}"
+
+
+def _variant_path(path: Path, width: int, fmt: str) -> Path:
+    return path.with_name(f"{path.stem}-{width}.{fmt}")
+
+
+def _supported_formats():
+    from PIL import features
+    return [fmt for fmt in VARIANT_FORMATS if features.check(fmt)]
+
+
+def _build_variants(path: Path):
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        for width in VARIANT_WIDTHS:
+            # Never upscale; smaller images get a single variant at their own width
+            target_width = min(width, image.width)
+            resized = image if target_width == image.width else image.resize(
+                (target_width, round(image.height * target_width / image.width)), Image.LANCZOS
+            )
+            for fmt in _supported_formats():
+                variant = _variant_path(path, width, fmt)
+                if not variant.exists():
+                    temp = variant.with_name(f".{variant.name}.part")
+                    resized.save(temp, format=fmt.upper(), quality=VARIANT_FORMATS[fmt][1])
+                    os.replace(temp, variant)
+            if target_width == image.width:
+                break
+
+
+def _variants_done(path: Path, future):
+    from app.question_cache import question_cache
+
+    if future.exception() is not None:
+        logger.warning("Could not build image variants for %s: %s", path.name, future.exception())
+        return
+    # Rebuild /api/questions so it starts pointing at the new variants
+    question_cache.invalidate()
+
+
+def schedule_variants(path: Path):
+    """Builds the resized variants of an upload in the image pool, once per process."""
+    if importlib.util.find_spec("PIL") is None:
+        return
+    with _scheduled_lock:
+        if path in _scheduled:
+            return
+        _scheduled.add(path)
+    future = _executor.submit(_build_variants, path)
+    future.add_done_callback(lambda f: _variants_done(path, f))
+
+
+def image_sources(url):
+    """Returns (src, {mime: srcset}) for an image URL, using whatever variants exist.
+
+    Uploads without variants yet (older files, or still being resized) are
+    served as-is and queued for resizing.
+    """
+    if not url or not url.startswith(UPLOAD_URL + "/"):
+        return url, {}
+    path = UPLOAD_DIR / url.rsplit("/", 1)[1]
+    sources = {}
+    for fmt, (mime, _) in VARIANT_FORMATS.items():
+        entries = [
+            f"{UPLOAD_URL}/{_variant_path(path, width, fmt).name} {width}w"
+            for width in VARIANT_WIDTHS if _variant_path(path, width, fmt).exists()
+        ]
+        if entries:
+            sources[mime] = ", ".join(entries)
+    if not sources and path.exists():
+        schedule_variants(path)
+    src = url
+    webp = [w for w in VARIANT_WIDTHS if _variant_path(path, w, "webp").exists()]
+    if webp:
+        # Largest WebP for clients that ignore <source>; still far smaller than the original
+        src = f"{UPLOAD_URL}/{_variant_path(path, webp[-1], 'webp').name}"
+    return src, sources
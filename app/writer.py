@@ -0,0 +1,128 @@
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from sqlmodel import Session
+
+from app.database import engine, async_session_maker, write_engine
+
+WRITER_BATCH_SIZE = int(os.getenv("SQLITE_WRITER_BATCH_SIZE", "64"))
+
+_STOP = object()
+
+
+class SerializedWriter:
+    """Runs write functions ``fn(session) -> result`` and commits them.
+
+    In SQLite production mode every write goes through one thread and one
+    connection. Jobs that queue up while a transaction is running are
+    group-committed together, each inside its own SAVEPOINT so one failing
+    job doesn't take the rest of the batch down with it. This removes
+    "database is locked" errors because only one writer exists.
+
+    Otherwise (Postgres, or plain SQLite) the function runs directly and
+    commits on its own. Callers that already hold a request session should
+    pass it, so the write reuses that connection instead of checking out a
+    second one (under load that would deadlock the pool).
+    """
+
+    def __init__(self, write_engine=None, batch_size: int = WRITER_BATCH_SIZE):
+        self.write_engine = write_engine
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.write_engine is not None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, fn) -> Future:
+        future = Future()
+        self.start()
+        self._queue.put((fn, future))
+        return future
+
+    async def run(self, fn, session=None):
+        if self.enabled:
+            return await asyncio.wrap_future(self.submit(fn))
+        if session is not None:
+            result = await session.run_sync(fn)
+            await session.commit()
+            return result
+        async with async_session_maker() as session:
+            result = await session.run_sync(fn)
+            await session.commit()
+            return result
+
+    def run_sync(self, fn, session=None):
+        if self.enabled:
+            return self.submit(fn).result()
+        if session is not None:
+            result = fn(session)
+            session.commit()
+            return result
+        with Session(engine, expire_on_commit=False) as session:
+            result = fn(session)
+            session.commit()
+            return result
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = _STOP in batch
+            jobs = [job for job in batch if job is not _STOP]
+            if jobs:
+                self._commit_batch(jobs)
+            if stop:
+                return
+
+    def _commit_batch(self, jobs):
+        done = []
+        with Session(self.write_engine, expire_on_commit=False) as session:
+            for fn, future in jobs:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with session.begin_nested():
+                        result = fn(session)
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    done.append((future, result))
+            try:
+                session.commit()
+            except Exception as exc:
+                for future, _ in done:
+                    future.set_exception(exc)
+                return
+        for future, result in done:
+            future.set_result(result)
+
+
+writer = SerializedWriter(write_engine)
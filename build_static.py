@@ -0,0 +1,98 @@
+"""
+Builds fingerprinted, compressed copies of everything in static/ into
+static/build/ and writes static/build/manifest.json for asset_url().
+
+    css/style.css -> build/css/style.<hash>.css (+ .gz, + .br if brotli is installed)
+    img/Logo.png  -> build/img/Logo.<hash>.png  (downscaled, optimized) + .webp
+
+Run it on every deploy after the checkout; sources edited after a build are
+served unfingerprinted until the next one.
+
+Usage:
+    python build_static.py [--max-image-width 256]
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+
+from app.assets import BUILD_DIR, MANIFEST_PATH, STATIC_DIR
+
+SKIP_DIRS = {"build", os.path.join("img", "uploads")}
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+OPTIMIZABLE_IMAGES = {".png", ".jpg", ".jpeg"}
+
+
+def compress(path: str, data: bytes):
+    with open(f"{path}.gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(f"{path}.br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def optimize_image(data: bytes, extension: str, max_width: int):
+    """Returns (optimized bytes in the original format, WebP bytes)."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        original = io.BytesIO()
+        if extension == ".png":
+            image.save(original, format="PNG", optimize=True)
+        else:
+            image.convert("RGB").save(original, format="JPEG", quality=85, optimize=True, progressive=True)
+        webp = io.BytesIO()
+        image.save(webp, format="WEBP", quality=85, method=6)
+    return original.getvalue(), webp.getvalue()
+
+
+def build(max_image_width: int) -> dict:
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), STATIC_DIR) not in SKIP_DIRS]
+        for name in files:
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, STATIC_DIR).replace(os.sep, "/")
+            stem, extension = os.path.splitext(path)
+            with open(source, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stat_result = os.stat(source)
+            entry = {"file": f"{stem}.{digest}{extension}", "size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns}
+
+            outputs = {"file": data}
+            if extension.lower() in OPTIMIZABLE_IMAGES:
+                outputs["file"], outputs["webp"] = optimize_image(data, extension.lower(), max_image_width)
+                entry["webp"] = f"{stem}.{digest}.webp"
+
+            for variant, content in outputs.items():
+                target = os.path.join(BUILD_DIR, entry[variant])
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(content)
+                if extension.lower() in COMPRESSIBLE:
+                    compress(target, content)
+                print(f"  ✅ {path} -> build/{entry[variant]} ({len(data):,} -> {len(content):,} bytes)")
+            manifest[path] = entry
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and compress static assets.")
+    parser.add_argument("--max-image-width", type=int, default=256,
+                        help="downscale images wider than this (the logo is shown at 40px)")
+    args = parser.parse_args()
+    manifest = build(args.max_image_width)
+    print(f"\n{len(manifest)} asset(s) written to {os.path.relpath(BUILD_DIR)}")
@@ -0,0 +1,91 @@
+"""
+Prints the query plan of every hot route query and flags full table scans.
+Uses DATABASE_URL from .env (PostgreSQL) or the local SQLite file.
+
+Usage:
+    python explain_queries.py                # plans as the planner picks them
+    python explain_queries.py --no-seqscan   # Postgres: show whether an index *can* be used
+                                             # (tiny tables are always seq-scanned otherwise)
+"""
+import sys
+
+from sqlalchemy import case, func, update
+from sqlmodel import select, text
+
+from app.database import engine, create_db_and_tables
+from app.leaderboard import ranking_query
+from app.models import Team, Question, TeamAnswer
+
+# route -> statement, exactly as the routes build them
+QUERIES = {
+    "start_game: team by name": select(Team).where(Team.name == "Team A"),
+    "status stream: team by id": select(Team).where(Team.id == 1),
+    "approve_all": update(Team).where(Team.status == "pending", Team.status != "approved").values(status="approved"),
+    "dashboard: pending page": select(Team).where(Team.status == "pending").order_by(Team.id).limit(51),
+    "dashboard: approved page": (
+        select(Team).where(Team.status == "approved", Team.score < 100)
+        .order_by(Team.score.desc(), Team.id).limit(51)
+    ),
+    "dashboard: counters": select(
+        func.count(case((Team.status == "pending", 1))),
+        func.count(case((Team.end_time.is_not(None), 1))),
+    ),
+    "leaderboard: rebuild": ranking_query(),
+    "leaderboard: export": (
+        select(Team.name, Team.score, Team.time_taken_seconds)
+        .where(Team.status == "approved")
+        .order_by(Team.score.desc(), Team.time_taken_seconds.asc())
+    ),
+    "regrade: answers of finished teams": (
+        select(TeamAnswer.team_id, TeamAnswer.question_id, TeamAnswer.answer)
+        .join(Team, Team.id == TeamAnswer.team_id)
+        .where(Team.end_time.is_not(None))
+    ),
+    "questions page": select(Question).where(Question.id > 0).order_by(Question.id).limit(51),
+}
+
+# Full scans that are expected: aggregates over the whole table and joins driven by it
+EXPECTED_SCANS = {"dashboard: counters", "regrade: answers of finished teams"}
+
+
+def explain(connection, statement):
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+    return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def is_full_scan(line: str) -> bool:
+    if "Seq Scan" in line:
+        return True
+    # SQLite: "SCAN team" is a table scan, "SCAN team USING INDEX ..." is not
+    return line.strip().startswith("SCAN ") and "USING" not in line
+
+
+def main():
+    create_db_and_tables()  # make sure the migrations (and their indexes) are applied
+    flagged = []
+    with engine.connect() as connection:
+        print(f"Dialect: {connection.dialect.name}\n")
+        if connection.dialect.name == "postgresql" and "--no-seqscan" in sys.argv:
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, statement in QUERIES.items():
+            plan = explain(connection, statement)
+            print(f"--- {name}")
+            for line in plan:
+                print(f"    {line}")
+            if any(is_full_scan(line) for line in plan) and name not in EXPECTED_SCANS:
+                flagged.append(name)
+        connection.rollback()
+
+    print()
+    if flagged:
+        print("Full table scans:")
+        for name in flagged:
+            print(f"  ❌ {name}")
+        sys.exit(1)
+    print("✅ No unexpected full table scans.")
+
+
+if __name__ == "__main__":
+    main()
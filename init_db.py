@@ -0,0 +1,29 @@
+"""
+One-time database setup: creates missing tables, applies migrations and
+seeds the first admin (admin / admin123, change it right away).
+
+Run it once per database before deploying with SKIP_DB_INIT=true, and again
+after upgrades that add migrations. Safe to re-run.
+
+Usage:
+    python init_db.py
+"""
+import logging
+
+from sqlmodel import Session
+
+from app.database import DATABASE_URL, create_db_and_tables, engine
+from app.routers.auth import create_initial_admin
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"Initializing {'PostgreSQL' if DATABASE_URL else 'SQLite'} database...")
+    create_db_and_tables()
+    with Session(engine) as session:
+        create_initial_admin(session)
+    print("✅ Tables, migrations and admin account are in place.")
+
+
+if __name__ == "__main__":
+    main()
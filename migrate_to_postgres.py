@@ -1,55 +1,163 @@
 """
-One-time migration script: clears PostgreSQL and re-copies all data from SQLite.
+Copies all data from the local SQLite database into PostgreSQL.
 Set DATABASE_URL in .env before running.
 
+Tables are streamed in primary-key order in chunks: each chunk is written with
+COPY (psycopg2) or a bulk INSERT and committed on its own, so memory stays
+bounded and an interrupted run can pick up where it stopped. Primary keys are
+kept as-is and the id sequences are moved past them at the end.
+
 Usage:
-    venv\\Scripts\\python migrate_to_postgres.py
+    venv\\Scripts\\python migrate_to_postgres.py            # wipe the target, copy everything
+    venv\\Scripts\\python migrate_to_postgres.py --resume   # continue after the last committed chunk
+    options: --source puzzlemania.db --chunk-size 5000 --target <url, default DATABASE_URL>
 """
+import argparse
+import io
 import os
+import sys
+import time
+from datetime import datetime
+
 from dotenv import load_dotenv
-from sqlmodel import SQLModel, create_engine, Session, select, text
-from app.models import Team, Question, Admin, Feedback
-
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise SystemExit("ERROR: DATABASE_URL is not set in .env")
-
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-# Source: local SQLite
-sqlite_engine = create_engine("sqlite:///puzzlemania.db", connect_args={"check_same_thread": False})
-
-# Destination: PostgreSQL
-pg_engine = create_engine(DATABASE_URL)
-SQLModel.metadata.create_all(pg_engine)
-
-# --- Step 1: Clear all PostgreSQL tables ---
-print("Clearing existing PostgreSQL data...")
-with pg_engine.connect() as conn:
-    conn.execute(text("DELETE FROM feedback"))
-    conn.execute(text("DELETE FROM team"))
-    conn.execute(text("DELETE FROM question"))
-    conn.execute(text("DELETE FROM admin"))
-    conn.commit()
-print("  ✅ All tables cleared.\n")
-
-# --- Step 2: Migrate per model ---
-def migrate_model(model_cls):
-    with Session(sqlite_engine) as src, Session(pg_engine) as dst:
-        items = src.exec(select(model_cls)).all()
-        count = 0
-        for item in items:
-            dst.add(model_cls.model_validate(item))
-            count += 1
-        dst.commit()
-        print(f"  ✅ {model_cls.__name__}: migrated {count} row(s)")
-
-print("Migrating data: SQLite → PostgreSQL...")
-migrate_model(Admin)
-migrate_model(Question)
-migrate_model(Team)
-migrate_model(Feedback)
-print("\nMigration complete! 🎉")
+from sqlalchemy import Integer, func, insert, inspect, select, text, tuple_
+from sqlmodel import SQLModel, create_engine
+
+import app.models  # noqa: F401  (registers the tables on SQLModel.metadata)
+from app.migrations import run_migrations
+
+# Copy order; there are no foreign keys, this just puts the small tables first
+TABLES = ["admin", "question", "team", "feedback", "teamanswer", "teamarchive", "questionassignment", "statecounter"]
+
+
+def copy_value(value) -> str:
+    """Formats one value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (bytes, memoryview)):
+        return "\\\\x" + bytes(value).hex()  # bytea hex input, backslash escaped for COPY
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def write_chunk(connection, table, rows):
+    dbapi_connection = connection.connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    if hasattr(cursor, "copy_expert"):
+        # psycopg2: COPY is several times faster than INSERT for bulk loads
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        columns = ", ".join(f'"{column.name}"' for column in table.columns)
+        cursor.copy_expert(f'COPY "{table.name}" ({columns}) FROM STDIN', buffer)
+    else:
+        connection.execute(insert(table), [dict(row._mapping) for row in rows])
+
+
+def last_copied_key(connection, table, key):
+    """The highest primary key already in the target, i.e. where a resumed copy starts."""
+    row = connection.execute(select(*key).order_by(*(column.desc() for column in key)).limit(1)).first()
+    return tuple(row) if row else None
+
+
+def copy_table(source, target, table, chunk_size, resume):
+    key = list(table.primary_key.columns)
+    with source.connect() as src:
+        total = src.execute(select(func.count()).select_from(table)).scalar_one()
+    with target.connect() as dst:
+        after = last_copied_key(dst, table, key) if resume else None
+        done = dst.execute(select(func.count()).select_from(table)).scalar_one() if after else 0
+
+    started = time.perf_counter()
+    copied = 0
+    with source.connect() as src:
+        while True:
+            statement = select(table).order_by(*key).limit(chunk_size)
+            if after is not None:
+                statement = statement.where(tuple_(*key) > tuple_(*after))
+            rows = src.execute(statement).all()
+            if not rows:
+                break
+            # One transaction per chunk: a resumed run never sees half a chunk
+            with target.begin() as dst:
+                write_chunk(dst, table, rows)
+            after = tuple(getattr(rows[-1], column.name) for column in key)
+            copied += len(rows)
+            rate = copied / max(time.perf_counter() - started, 1e-9)
+            print(f"\r  {table.name}: {done + copied}/{total} rows ({rate:,.0f} rows/s)", end="", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"\r  ✅ {table.name}: {copied} row(s) copied in {elapsed:.2f}s"
+          + (f", {done} already there" if done else "") + " " * 20)
+
+
+def reset_sequences(target, tables):
+    """Moves each serial sequence past the copied ids so new inserts don't collide."""
+    with target.begin() as connection:
+        for table in tables:
+            key = list(table.primary_key.columns)
+            # Only single integer keys have a sequence; string keys report autoincrement="auto" too
+            if len(key) != 1 or not isinstance(key[0].type, Integer) or key[0].autoincrement is False:
+                continue
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{key[0].name}'), "
+                f"COALESCE(MAX(\"{key[0].name}\"), 1), MAX(\"{key[0].name}\") IS NOT NULL) FROM \"{table.name}\""
+            ))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Copy the SQLite database into PostgreSQL.")
+    parser.add_argument("--source", default="puzzlemania.db", help="SQLite file to copy from")
+    parser.add_argument("--target", default=os.getenv("DATABASE_URL"), help="target database URL")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--resume", action="store_true", help="keep existing rows and continue after them")
+    args = parser.parse_args()
+
+    if not args.target:
+        sys.exit("ERROR: DATABASE_URL is not set in .env")
+    target_url = args.target
+    if target_url.startswith("postgres://"):
+        target_url = target_url.replace("postgres://", "postgresql://", 1)
+
+    source = create_engine(f"sqlite:///{args.source}")
+    target = create_engine(target_url)
+    SQLModel.metadata.create_all(target)
+    run_migrations(target)
+    tables = [SQLModel.metadata.tables[name] for name in TABLES]
+
+    if not args.resume:
+        print("Clearing existing target data...")
+        with target.begin() as connection:
+            if target.dialect.name == "postgresql":
+                connection.execute(text("TRUNCATE " + ", ".join(f'"{name}"' for name in TABLES)))
+            else:
+                for table in reversed(tables):
+                    connection.execute(table.delete())
+        print("  ✅ All tables cleared.\n")
+
+    print(f"Migrating data: SQLite → {target.dialect.name} (chunks of {args.chunk_size})...")
+    started = time.perf_counter()
+    source_tables = set(inspect(source).get_table_names())
+    for table in tables:
+        if table.name not in source_tables:
+            # Older databases predate some tables
+            print(f"  ⏭️  {table.name}: not in source, skipped")
+            continue
+        copy_table(source, target, table, args.chunk_size, args.resume)
+    if target.dialect.name == "postgresql":
+        reset_sequences(target, tables)
+        print("  ✅ Sequences reset.")
+    print(f"\nMigration complete in {time.perf_counter() - started:.2f}s! 🎉")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+// Admin dashboard: sections are fetched page by page instead of rendered server-side
+const cursors = {};
+let progressPages = 1;
+
+document.addEventListener('DOMContentLoaded', () => {
+    loadCounters();
+    setInterval(loadCounters, 5000);
+    loadProgress();
+    setInterval(loadProgress, 5000);
+
+    loadQuestions();
+    loadTeams('pending');
+    loadTeams('approved');
+
+    document.getElementById('questions-more').onclick = () => loadQuestions();
+    document.getElementById('pending-more').onclick = () => loadTeams('pending');
+    document.getElementById('approved-more').onclick = () => loadTeams('approved');
+    document.getElementById('progress-more').onclick = () => { progressPages++; loadProgress(); };
+});
+
+function cell(content, style) {
+    const td = document.createElement('td');
+    td.style.padding = '10px';
+    if (style) Object.assign(td.style, style);
+    if (content instanceof Node) {
+        td.appendChild(content);
+    } else {
+        td.textContent = content;
+    }
+    return td;
+}
+
+function actionLink(href, label, color, confirmText) {
+    const a = document.createElement('a');
+    a.href = href;
+    a.className = 'nav-link';
+    a.textContent = label;
+    a.style.color = color;
+    a.style.borderColor = color;
+    if (confirmText) a.onclick = () => confirm(confirmText);
+    return a;
+}
+
+async function fetchPage(url) {
+    const response = await fetch(url, { cache: 'no-store' });
+    if (response.status === 401) {
+        window.location.href = '/auth/login';
+        return null;
+    }
+    return response.json();
+}
+
+async function loadCounters() {
+    try {
+        const data = await fetchPage('/admin/api/counters');
+        if (!data) return;
+        document.querySelectorAll('[data-counter]').forEach(el => {
+            const value = data[el.dataset.counter];
+            el.textContent = value === null ? '-' : value;
+        });
+        document.getElementById('pending-section').style.display = data.pending > 0 ? 'block' : 'none';
+    } catch (e) { console.error(e); }
+}
+
+async function loadProgress() {
+    // Re-polls every page the admin has opened; the server only returns teams still playing
+    try {
+        const playing = [];
+        let after = null;
+        let data;
+        for (let page = 0; page < progressPages; page++) {
+            const params = new URLSearchParams();
+            if (after) params.set('after', after);
+            data = await fetchPage(`/admin/api/progress?${params}`);
+            if (!data) return;
+            playing.push(...data.items);
+            after = data.next;
+            if (!after) break;
+        }
+        const tbody = document.getElementById('progress-teams');
+        tbody.replaceChildren(...playing.map(team => {
+            const tr = document.createElement('tr');
+            tr.style.borderBottom = '1px solid rgba(255,255,255,0.05)';
+            tr.append(cell(team.name), cell(`${team.answered} / ${data.total_questions}`, { textAlign: 'right' }));
+            return tr;
+        }));
+        document.getElementById('progress-more').style.display = after ? 'block' : 'none';
+        document.getElementById('progress-section').style.display = playing.length ? 'block' : 'none';
+    } catch (e) { console.error(e); }
+}
+
+async function loadQuestions() {
+    const params = new URLSearchParams();
+    if (cursors.questions) params.set('after', cursors.questions);
+    const page = await fetchPage(`/admin/api/questions?${params}`);
+    if (!page) return;
+
+    const container = document.getElementById('questions');
+    page.items.forEach(q => {
+        const card = document.createElement('div');
+        card.className = 'card';
+        Object.assign(card.style, { display: 'flex', justifyContent: 'space-between', alignItems: 'center' });
+
+        const body = document.createElement('div');
+        const difficulty = document.createElement('strong');
+        difficulty.textContent = `[${q.difficulty}]`;
+        body.appendChild(difficulty);
+        body.appendChild(document.createTextNode(
+            ` ${q.content_text || ''} ${q.content_image ? '[Image]' : ''}`
+        ));
+        body.appendChild(document.createElement('br'));
+        const answer = document.createElement('span');
+        answer.style.color = 'gray';
+        answer.textContent = `Answer: ${q.answer}`;
+        body.appendChild(answer);
+
+        const form = document.createElement('form');
+        form.action = `/admin/question/delete/${q.id}`;
+        form.method = 'get';
+        form.onsubmit = () => confirm('Are you sure you want to delete this question?');
+        const button = document.createElement('button');
+        button.type = 'submit';
+        button.className = 'danger';
+        button.style.padding = '8px 16px';
+        button.style.fontSize = '0.9rem';
+        button.textContent = 'DELETE';
+        form.appendChild(button);
+
+        card.appendChild(body);
+        card.appendChild(form);
+        container.appendChild(card);
+    });
+
+    cursors.questions = page.next;
+    document.getElementById('questions-more').style.display = page.next ? 'block' : 'none';
+}
+
+async function loadTeams(status) {
+    const params = new URLSearchParams({ status });
+    if (cursors[status]) params.set('after', cursors[status]);
+    const page = await fetchPage(`/admin/api/teams?${params}`);
+    if (!page) return;
+
+    const tbody = document.getElementById(`${status}-teams`);
+    page.items.forEach(team => {
+        const tr = document.createElement('tr');
+        tr.style.borderBottom = '1px solid rgba(255,255,255,0.05)';
+        if (status === 'pending') {
+            const actions = document.createElement('span');
+            const approve = actionLink(`/admin/team/approve/${team.id}`, 'Approve', '#4ade80');
+            approve.style.marginRight = '10px';
+            actions.appendChild(approve);
+            actions.appendChild(actionLink(`/admin/team/reject/${team.id}`, 'Reject', '#ef4444', 'Reject this team?'));
+            tr.append(cell(team.name), cell(team.roll_number), cell(team.rc_number),
+                cell(actions, { textAlign: 'right' }));
+        } else {
+            const rank = tbody.rows.length + 1;
+            const time = team.time_taken_seconds ? `${team.time_taken_seconds.toFixed(2)}s` : '-';
+            tr.append(cell(`#${rank}`), cell(team.name), cell(team.score), cell(time));
+        }
+        tbody.appendChild(tr);
+    });
+
+    cursors[status] = page.next;
+    document.getElementById(`${status}-more`).style.display = page.next ? 'block' : 'none';
+}
+
+async function archiveAndClear() {
+    if (!confirm('Archive ALL teams and scores, then clear the leaderboard?')) return;
+    try {
+        const response = await fetch('/admin/api/teams/archive', { method: 'POST' });
+        const result = await response.json();
+        alert(`Archived ${result.affected} team(s) in ${result.elapsed_ms} ms.`);
+        window.location.reload();
+    } catch (e) {
+        alert('Archive failed.');
+    }
+}
@@ -2,6 +2,8 @@ let questions = [];
 let currentQuestionIndex = 0;
 let userAnswers = {};
 let timerInterval;
+let syncedAnswers = {};
+let progressTimer = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     // Only run on quiz page
@@ -10,10 +12,13 @@ document.addEventListener('DOMContentLoaded', () => {
         fetchQuestions();
     }
 
-    // Auto-refresh leaderboard
+    // Live leaderboard: stream rank changes, poll only as a fallback
     if (document.getElementById('leaderboard-table')) {
-        fetchLeaderboard();
-        setInterval(fetchLeaderboard, 5000);
+        if (window.EventSource) {
+            openLeaderboardStream();
+        } else {
+            startLeaderboardPolling();
+        }
     }
 
     setupLightning();
@@ -119,12 +124,18 @@ async function fetchQuestions() {
         questions = await response.json();
 
         if (questions && questions.length > 0) {
-            // Restore progress
+            // Restore progress: server checkpoints first, then anything newer in this browser
             try {
-                const saved = localStorage.getItem('pm_quiz_answers');
-                if (saved) {
-                    userAnswers = JSON.parse(saved);
+                const progress = await fetch('/api/progress', { cache: 'no-store' });
+                if (progress.ok) {
+                    syncedAnswers = await progress.json();
                 }
+            } catch (e) {
+                console.error("Failed to load checkpointed answers", e);
+            }
+            try {
+                const saved = localStorage.getItem('pm_quiz_answers');
+                userAnswers = { ...syncedAnswers, ...(saved ? JSON.parse(saved) : {}) };
             } catch (e) {
                 console.error("Failed to load saved state", e);
             }
@@ -178,6 +189,10 @@ function renderQuestion(index) {
 
     const img = document.getElementById('question-image');
     if (q.content_image) {
+        // Resized AVIF/WebP variants when the server has them, the original otherwise
+        const srcset = q.content_image_srcset || {};
+        document.getElementById('question-image-avif').srcset = srcset['image/avif'] || '';
+        document.getElementById('question-image-webp').srcset = srcset['image/webp'] || '';
         img.src = q.content_image;
         img.style.display = "block";
     } else {
@@ -203,6 +218,7 @@ function renderQuestion(index) {
             radio.type = 'radio';
             radio.name = 'mcq_option';
             radio.value = trimmed;
+            radio.addEventListener('change', saveCurrentAnswer);
 
             // Restore selection
             if (userAnswers[q.id] === trimmed) {
@@ -225,6 +241,7 @@ function renderQuestion(index) {
         input.placeholder = 'Your Answer...';
         input.style.textAlign = 'center';
         input.value = userAnswers[q.id] || "";
+        input.addEventListener('input', saveCurrentAnswer);
         inputContainer.appendChild(input);
 
         // Auto-focus text input
@@ -254,6 +271,39 @@ function saveCurrentAnswer() {
 
     // Persist to handle reloads
     localStorage.setItem('pm_quiz_answers', JSON.stringify(userAnswers));
+    scheduleProgressSync();
+}
+
+// Checkpoint changed answers on the server, at most once per second. A throttle, not a
+// debounce: a sync already scheduled is kept, so continuous typing still syncs every second
+function scheduleProgressSync() {
+    if (progressTimer) return;
+    progressTimer = setTimeout(() => {
+        progressTimer = null;
+        syncProgress();
+    }, 1000);
+}
+
+async function syncProgress() {
+    const delta = {};
+    for (const [id, answer] of Object.entries(userAnswers)) {
+        if (syncedAnswers[id] !== answer) delta[id] = answer;
+    }
+    if (Object.keys(delta).length === 0) return;
+    try {
+        const response = await fetch('/api/progress', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(delta)
+        });
+        if (response.ok) {
+            Object.assign(syncedAnswers, delta);
+        } else if (response.status === 429) {
+            scheduleProgressSync();
+        }
+    } catch (e) {
+        scheduleProgressSync();
+    }
 }
 
 function nextQuestion() {
@@ -273,9 +323,12 @@ function prevQuestion() {
 
 async function submitQuiz() {
     saveCurrentAnswer(); // Ensure last answer is saved
+    clearTimeout(progressTimer);
+    progressTimer = null;
 
     // Confirmation if manually submitting (not timeout)
     if (document.getElementById('timer').innerText !== "00:00" && !confirm("Are you sure you want to finish the quiz?")) {
+        scheduleProgressSync(); // still playing: the answers cleared above must reach the server
         return;
     }
 
@@ -299,25 +352,108 @@ async function submitQuiz() {
     }
 }
 
+let leaderboardEtag = null;
+let leaderboardPoll = null;
+let leaderboardStream = null;
+let leaderboardVersion = null;
+
+function startLeaderboardPolling() {
+    if (leaderboardPoll) return;
+    fetchLeaderboard();
+    leaderboardPoll = setInterval(fetchLeaderboard, 5000);
+}
+
+function stopLeaderboardPolling() {
+    clearInterval(leaderboardPoll);
+    leaderboardPoll = null;
+}
+
 async function fetchLeaderboard() {
     try {
-        const response = await fetch('/api/leaderboard');
+        // Conditional request: the server answers 304 when the ranking hasn't changed
+        const headers = leaderboardEtag ? { 'If-None-Match': leaderboardEtag } : {};
+        const response = await fetch('/api/leaderboard', { headers, cache: 'no-store' });
+        if (response.status === 304) return;
+
         const data = await response.json();
-        const tbody = document.querySelector('#leaderboard-table tbody');
-        tbody.innerHTML = '';
-
-        data.forEach((team, index) => {
-            const row = `<tr>
-                <td>${index + 1}</td>
-                <td>${team.name}</td>
-                <td>${team.score}</td>
-                <td>${team.time_taken}</td>
-            </tr>`;
-            tbody.innerHTML += row;
-        });
+        leaderboardEtag = response.headers.get('ETag');
+        renderLeaderboard(data);
     } catch (e) { console.error(e); }
 }
 
+function leaderboardRow(team, rank) {
+    const tr = document.createElement('tr');
+    [rank, team.name, team.score, team.time_taken].forEach(value => {
+        const td = document.createElement('td');
+        td.textContent = value;
+        tr.appendChild(td);
+    });
+    return tr;
+}
+
+function renderLeaderboard(data) {
+    const tbody = document.querySelector('#leaderboard-table tbody');
+    tbody.replaceChildren(...data.map((team, index) => leaderboardRow(team, index + 1)));
+}
+
+function renumberLeaderboard(tbody, from) {
+    for (let i = from; i < tbody.rows.length; i++) {
+        tbody.rows[i].cells[0].textContent = i + 1;
+    }
+}
+
+function applyLeaderboardDelta(delta) {
+    const tbody = document.querySelector('#leaderboard-table tbody');
+
+    if (delta.type === 'reset') {
+        // Ranking rebuilt or cleared server-side; resync from a fresh snapshot
+        leaderboardStream.close();
+        openLeaderboardStream();
+        return;
+    }
+
+    let from = delta.rank - 1;
+    if (delta.previous_rank) {
+        tbody.rows[delta.previous_rank - 1].remove();
+        from = Math.min(from, delta.previous_rank - 1);
+    }
+    tbody.insertBefore(leaderboardRow(delta.row, delta.rank), tbody.rows[delta.rank - 1] || null);
+    renumberLeaderboard(tbody, from);
+}
+
+function openLeaderboardStream() {
+    const stream = new EventSource('/api/leaderboard/stream');
+    leaderboardStream = stream;
+
+    stream.addEventListener('snapshot', (event) => {
+        const snapshot = JSON.parse(event.data);
+        leaderboardVersion = snapshot.version;
+        stopLeaderboardPolling();
+        renderLeaderboard(snapshot.rows);
+    });
+
+    stream.onmessage = (event) => {
+        const delta = JSON.parse(event.data);
+        if (leaderboardVersion === null || delta.version <= leaderboardVersion) return;
+        if (delta.version !== leaderboardVersion + 1) {
+            // Missed an update; reconnect to get a consistent snapshot
+            stream.close();
+            openLeaderboardStream();
+            return;
+        }
+        leaderboardVersion = delta.version;
+        applyLeaderboardDelta(delta);
+    };
+
+    stream.onerror = () => {
+        // EventSource retries on its own; poll in the meantime and if it gives up
+        startLeaderboardPolling();
+        if (stream.readyState === EventSource.CLOSED) {
+            leaderboardStream = null;
+        }
+    };
+}
+
 // Feedback Modal Logic
 function openFeedback() {
     const modal = document.getElementById('feedback-modal');
@@ -348,6 +484,10 @@ async function submitFeedback() {
             body: JSON.stringify({ content: text })
         });
 
+        if (response.status === 429) {
+            alert("Lots of feedback coming in right now, please try again in a few seconds.");
+            return;
+        }
         const result = await response.json();
         if (result.success) {
             alert("Thanks for your thoughts! 🧠");
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+import app.models  # noqa: F401  (registers the tables on SQLModel.metadata)
+from app.writer import writer
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory SQLite with every table; writer jobs run against it and commit."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    def run_sync(fn, session=None):
+        with Session(engine, expire_on_commit=False) as write_session:
+            result = fn(write_session)
+            write_session.commit()
+            return result
+
+    async def run(fn, session=None):
+        return run_sync(fn)
+
+    monkeypatch.setattr(writer, "run_sync", run_sync)
+    monkeypatch.setattr(writer, "run", run)
+    return engine
+
+
+@pytest.fixture
+def redis_backends(monkeypatch):
+    """Two Redis state backends, as on two workers, sharing one in-process fake server."""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = pytest.importorskip("redis")
+    from app.state import RedisBackend
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", classmethod(lambda cls, url: fakeredis.FakeRedis(server=server)))
+    workers = [RedisBackend("redis://test"), RedisBackend("redis://test")]
+    yield workers
+    for backend in workers:
+        backend.stop()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
@@ -0,0 +1,126 @@
+import asyncio
+
+import orjson
+from sqlmodel import Session, select
+
+from app import assembly
+from app.assembly import TeamQuestionSets, _allocate, _strata, assign_questions, draw, pack_ids, unpack_ids
+from app.models import Question, QuestionAssignment
+from app.question_cache import QuestionSet
+from conftest import wait_for
+
+
+def make_questions(difficulties):
+    return [
+        Question(id=index, content_text=f"Q{index}", answer="a", difficulty=difficulty, points=10)
+        for index, difficulty in enumerate(difficulties, start=1)
+    ]
+
+
+def test_pack_ids_round_trip():
+    ids = [5, 1, 2**31 - 1]
+    assert len(pack_ids(ids)) == 12
+    assert unpack_ids(memoryview(pack_ids(ids))) == ids
+    assert unpack_ids(b"") == []
+
+
+def test_strata_are_in_quiz_order():
+    strata = _strata([(1, "Hard"), (2, "Bonus"), (3, "Easy"), (4, "Medium"), (5, "Easy")])
+    assert list(strata) == ["Easy", "Medium", "Hard", "Bonus"]
+    assert strata["Easy"] == [3, 5]
+
+
+def test_allocate_uses_largest_remainder():
+    strata = {"Easy": list(range(5)), "Medium": list(range(3)), "Hard": list(range(2))}
+    assert _allocate(strata, 4) == {"Easy": 2, "Medium": 1, "Hard": 1}
+    assert sum(_allocate(strata, 7).values()) == 7
+    assert _allocate(strata, 50) == {"Easy": 5, "Medium": 3, "Hard": 2}
+    assert _allocate({}, 4) == {}
+
+
+def test_draw_is_seeded_per_team():
+    strata = {"Easy": list(range(1, 21)), "Hard": list(range(21, 41))}
+    counts = {"Easy": 3, "Hard": 2}
+    first = draw(1, strata, counts)
+    assert first == draw(1, strata, counts)
+    assert first != draw(2, strata, counts)
+    assert all(q_id <= 20 for q_id in first[:3]) and all(q_id > 20 for q_id in first[3:])
+
+
+def test_assign_questions_upserts(db, monkeypatch):
+    monkeypatch.setattr(assembly, "QUIZ_QUESTIONS_PER_TEAM", 3)
+    with Session(db) as session:
+        session.add_all(make_questions(["Easy"] * 4 + ["Hard"] * 2))
+        session.commit()
+        drawn = assign_questions(session, [1, 2])
+        session.commit()
+        assert set(drawn) == {1, 2} and all(len(ids) == 3 for ids in drawn.values())
+
+        monkeypatch.setattr(assembly, "QUIZ_SEED", "another event")
+        redrawn = assign_questions(session, [1])
+        session.commit()
+        rows = {row.team_id: unpack_ids(row.question_ids) for row in session.exec(select(QuestionAssignment))}
+    assert rows == {1: redrawn[1], 2: drawn[2]}
+
+
+def test_assign_questions_is_a_no_op_when_disabled(db, monkeypatch):
+    monkeypatch.setattr(assembly, "QUIZ_QUESTIONS_PER_TEAM", 0)
+    with Session(db) as session:
+        assert assign_questions(session, [1]) == {}
+
+
+def test_payload_follows_draw_order_and_generation():
+    question_sets = TeamQuestionSets()
+    question_sets._store({7: [3, 1, 99]})  # 99 was deleted since the draw
+    question_set = QuestionSet(1, make_questions(["Easy", "Easy", "Hard"]))
+    payload = asyncio.run(question_sets.payload(None, question_set, 7))
+    assert [question["id"] for question in orjson.loads(payload.body)] == [3, 1]
+    assert asyncio.run(question_sets.payload(None, question_set, 7)) is payload
+
+    edited = QuestionSet(2, make_questions(["Easy", "Easy", "Easy"]))
+    rebuilt = asyncio.run(question_sets.payload(None, edited, 7))
+    assert rebuilt is not payload
+    assert [question["difficulty"] for question in orjson.loads(rebuilt.body)] == ["Easy", "Easy"]
+
+
+def test_payload_assigns_teams_approved_before_assignments(db, monkeypatch):
+    monkeypatch.setattr(assembly, "QUIZ_QUESTIONS_PER_TEAM", 2)
+    with Session(db) as session:
+        session.add_all(make_questions(["Easy", "Medium", "Hard", "Hard"]))
+        session.commit()
+
+    class NoAssignment:
+        async def get(self, model, key):
+            return None
+
+    question_set = QuestionSet(1, make_questions(["Easy", "Medium", "Hard", "Hard"]))
+    payload = asyncio.run(TeamQuestionSets().payload(NoAssignment(), question_set, 5))
+    assert len(orjson.loads(payload.body)) == 2
+    with Session(db) as session:
+        assert session.get(QuestionAssignment, 5) is not None
+
+
+def test_store_evicts_least_recently_used():
+    question_sets = TeamQuestionSets(maxsize=2)
+    question_sets._store({1: [1], 2: [2]})
+    question_sets._get(1)
+    question_sets._store({"3": [3]})
+    assert question_sets._get(2) is None
+    assert question_sets._get(3)[0] == [3]
+    question_sets._store(None)
+    assert question_sets._get(1) is None
+
+
+def test_remember_replicates_question_sets(redis_backends, monkeypatch):
+    local, remote = redis_backends
+    local_sets, remote_sets = TeamQuestionSets(), TeamQuestionSets()
+    remote.on("question-assignments", remote_sets._store)
+    for backend in redis_backends:
+        backend.start()
+    monkeypatch.setattr(assembly, "shared_state", local)
+
+    local_sets.remember({7: [3, 1, 2], 8: [2]})
+    assert local_sets._get(7)[0] == [3, 1, 2]
+    assert wait_for(lambda: remote_sets._get(8) is not None)
+    assert remote_sets._get(7)[0] == [3, 1, 2]
+    assert remote_sets._get(8)[0] == [2]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.batching import BatchQueue, QueueFull
+
+
+def run_queue(handler, items, max_retries=1):
+    """Queues ``items`` into one batch, drains it and returns each item's result or exception."""
+    async def main():
+        queue = BatchQueue("test", handler, batch_size=len(items), flush_interval=0.001, max_retries=max_retries)
+        futures = [queue.put_nowait(item) for item in items]
+        await queue.stop()
+        return queue, [future.exception() or future.result() for future in futures]
+
+    return asyncio.run(main())
+
+
+def test_batch_results_resolve_each_future():
+    async def handler(items):
+        return [item * 2 for item in items]
+
+    queue, results = run_queue(handler, [1, 2, 3])
+    assert results == [2, 4, 6]
+    assert queue.stats()["failures"] == 0
+
+
+def test_transient_failure_is_retried():
+    calls = []
+
+    async def handler(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return items
+
+    _, results = run_queue(handler, ["a", "b"])
+    assert results == ["a", "b"]
+    assert calls == [["a", "b"], ["a", "b"]]
+
+
+def test_bad_item_only_fails_itself():
+    async def handler(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    queue, results = run_queue(handler, ["a", "b", "bad", "c", "d"])
+    assert results[:2] == ["A", "B"] and results[3:] == ["C", "D"]
+    assert isinstance(results[2], ValueError)
+    assert queue.stats()["items"] == 4
+
+
+def test_single_item_batch_fails_after_retries():
+    async def handler(items):
+        raise ValueError("always")
+
+    queue, results = run_queue(handler, ["x"], max_retries=2)
+    assert isinstance(results[0], ValueError)
+    assert queue.stats()["failures"] == 3
+
+
+def test_put_nowait_raises_when_full():
+    async def main():
+        async def handler(items):
+            return items
+
+        queue = BatchQueue("test", handler, batch_size=10, flush_interval=1, maxsize=1)
+        queue.put_nowait(1)
+        with pytest.raises(QueueFull):
+            queue.put_nowait(2)
+        await queue.stop()
+
+    asyncio.run(main())
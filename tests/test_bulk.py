@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, select
+
+from app.bulk import archive_and_clear_teams, clear_teams, set_team_status
+from app.models import QuestionAssignment, Team, TeamAnswer, TeamArchive
+
+
+@pytest.fixture
+def session(db):
+    with Session(db) as session:
+        session.add_all([
+            Team(id=1, name="pending", status="pending"),
+            Team(id=2, name="playing", status="approved", start_time=datetime(2026, 1, 1)),
+            Team(id=3, name="rejected", status="rejected"),
+        ])
+        session.add(TeamAnswer(team_id=2, question_id=1, answer="a"))
+        session.add(QuestionAssignment(team_id=2, question_ids=b"\x01\x00\x00\x00"))
+        session.commit()
+        yield session
+
+
+def statuses(session):
+    return dict(session.exec(select(Team.id, Team.status)).all())
+
+
+def test_approve_skips_teams_already_approved(session):
+    approved = set_team_status(session, "approved")
+    session.commit()
+    assert sorted(approved) == [1, 3]
+    assert session.get(Team, 2).start_time == datetime(2026, 1, 1)
+    assert session.get(Team, 1).start_time is not None
+
+
+def test_status_change_filters_by_ids_and_current_status(session):
+    assert set_team_status(session, "approved", current_status="pending") == [1]
+    assert set_team_status(session, "rejected", ids=[2, 3]) == [2]
+    session.commit()
+    assert statuses(session) == {1: "approved", 2: "rejected", 3: "rejected"}
+
+
+def test_clear_teams_deletes_answers_and_assignments(session):
+    assert clear_teams(session) == 3
+    session.commit()
+    assert session.exec(select(Team)).all() == []
+    assert session.exec(select(TeamAnswer)).all() == []
+    assert session.exec(select(QuestionAssignment)).all() == []
+
+
+def test_archive_copies_every_team_before_clearing(session):
+    assert archive_and_clear_teams(session) == 3
+    session.commit()
+    archived = {row.team_id: row for row in session.exec(select(TeamArchive))}
+    assert sorted(archived) == [1, 2, 3]
+    assert archived[2].status == "approved"
+    assert archived[2].start_time == datetime(2026, 1, 1)
+    assert archived[1].archived_at is not None
+    assert session.exec(select(Team)).all() == []
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.dashboard import DashboardCounters, page_limit, questions_page, teams_page
+from app.models import Question, Team
+
+
+def walk(fetch):
+    """Every item of a keyset-paginated listing, following the cursors."""
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(cursor)
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+def test_page_limit_is_clamped():
+    assert page_limit(None) == 50
+    assert page_limit(0) == 50
+    assert page_limit(-5) == 1
+    assert page_limit(10_000) == 200
+
+
+def test_questions_pages_cover_the_bank_once(db):
+    with Session(db) as session:
+        session.add_all([Question(answer="a", difficulty="Easy", points=10) for _ in range(7)])
+        session.commit()
+        items, pages = walk(lambda after: questions_page(session, int(after) if after else None, 3))
+    assert [item["id"] for item in items] == list(range(1, 8))
+    assert pages == 3
+
+
+def test_approved_teams_page_by_score_with_ties(db):
+    scores = [30, 10, 30, 20, 30, 10]
+    with Session(db) as session:
+        session.add_all([Team(name=f"t{index}", status="approved", score=score) for index, score in enumerate(scores)])
+        session.add(Team(name="waiting", status="pending"))
+        session.commit()
+        first, cursor = teams_page(session, "approved", None, 2)
+        assert cursor == f"30:{first[-1]['id']}"
+        items, _ = walk(lambda after: teams_page(session, "approved", after, 2))
+    assert [(item["score"], item["id"]) for item in items] == [(30, 1), (30, 3), (30, 5), (20, 4), (10, 2), (10, 6)]
+
+
+def test_other_statuses_page_by_id(db):
+    with Session(db) as session:
+        session.add_all([Team(name=f"t{index}", status="pending") for index in range(5)])
+        session.commit()
+        items, pages = walk(lambda after: teams_page(session, "pending", after, 2))
+    assert [item["id"] for item in items] == [1, 2, 3, 4, 5]
+    assert pages == 3
+
+
+def test_counters_are_cached_until_invalidated(db):
+    counters = DashboardCounters(ttl=60)
+    with Session(db) as session:
+        session.add_all([
+            Team(name="a", status="approved", score=10, end_time=datetime(2026, 1, 1)),
+            Team(name="b", status="approved", score=25, end_time=datetime(2026, 1, 1)),
+            Team(name="c", status="pending"),
+        ])
+        session.commit()
+        assert counters.get(session) == {
+            "pending": 1, "approved": 2, "rejected": 0, "finished": 2, "average_score": 17.5,
+        }
+        session.add(Team(name="d", status="rejected"))
+        session.commit()
+        assert counters.get(session)["rejected"] == 0
+        counters.invalidate()
+        assert counters.get(session)["rejected"] == 1
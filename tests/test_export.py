@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session
+
+from app import export
+from app.export import EXPORT_COLUMNS, ExportUnavailable, get_exporter, stream_csv, stream_jsonl
+from app.models import Team
+
+ROWS = [
+    [1, "alpha", "R1", "C1", 30, "0m 5s 0ms", datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 10, 30)],
+    [2, "beta, inc", None, None, 20, "0s", None, None],
+]
+
+
+def test_stream_csv_writes_header_then_rows(monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_ROWS", 1)
+    body = b"".join(stream_csv(ROWS)).decode()
+    parsed = list(csv.reader(io.StringIO(body)))
+    assert parsed[0] == EXPORT_COLUMNS
+    assert parsed[2][:2] == ["2", "beta, inc"]
+    assert len(parsed) == 3
+
+
+def test_stream_csv_of_no_rows_is_just_the_header():
+    assert b"".join(stream_csv([])).decode().splitlines() == [",".join(EXPORT_COLUMNS)]
+
+
+def test_stream_jsonl_writes_one_object_per_row():
+    lines = b"".join(stream_jsonl(ROWS)).decode().splitlines()
+    first = json.loads(lines[0])
+    assert first["Team Name"] == "alpha"
+    assert first["Start Time"] == "2026-01-01 10:00:00"
+    assert json.loads(lines[1])["Roll Number"] is None
+
+
+def test_iter_leaderboard_rows_ranks_approved_teams(db, monkeypatch):
+    monkeypatch.setattr(export, "engine", db)
+    with Session(db) as session:
+        session.add_all([
+            Team(name="slow", status="approved", score=10, time_taken_seconds=90.0),
+            Team(name="fast", status="approved", score=10, time_taken_seconds=30.0),
+            Team(name="waiting", status="pending"),
+        ])
+        session.commit()
+    assert [row[:2] for row in export.iter_leaderboard_rows()] == [[1, "fast"], [2, "slow"]]
+
+
+def test_get_exporter_reports_missing_optional_modules(monkeypatch):
+    monkeypatch.setattr(export.importlib.util, "find_spec", lambda name: None)
+    assert get_exporter("csv")[1] == "text/csv"
+    with pytest.raises(ExportUnavailable, match="openpyxl"):
+        get_exporter("xlsx")
+
+
+def test_stream_xlsx_round_trips():
+    openpyxl = pytest.importorskip("openpyxl")
+    body = b"".join(export.stream_xlsx(ROWS))
+    sheet = openpyxl.load_workbook(io.BytesIO(body)).active
+    assert [cell.value for cell in sheet[1]] == EXPORT_COLUMNS
+    assert sheet.cell(row=3, column=2).value == "beta, inc"
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from app.grading import flatten_answers, score_columns
+from app.question_cache import MAX_ANSWER_LENGTH, QuestionSet
+
+
+def question(question_id, answer, points=10):
+    return SimpleNamespace(
+        id=question_id, answer=answer, points=points,
+        content_text="", content_image=None, difficulty="Easy", options=None,
+    )
+
+
+QUESTIONS = QuestionSet(0, [question(1, "Paris"), question(2, "42", points=20), question(3, "")])
+
+
+def test_scores_every_team_in_one_pass():
+    scores = score_columns(
+        [1, 1, 2, 2, 3],
+        [1, 2, 1, 2, 1],
+        [" paris ", "42", "London", "42", "PARIS"],
+        QUESTIONS,
+    )
+    assert scores == {1: 30, 2: 20, 3: 10}
+
+
+def test_unknown_questions_and_blank_answers_score_nothing():
+    # Question 3 has an empty key: a blank answer must not match it
+    assert score_columns([1, 1, 1], [3, 99, 2], ["", "Paris", ""], QUESTIONS) == {1: 0}
+
+
+def test_empty_batch_and_empty_bank():
+    assert score_columns([], [], [], QUESTIONS) == {}
+    assert score_columns([1], [1], ["Paris"], QuestionSet(0, [])) == {1: 0}
+
+
+def test_long_answers_are_cut_before_grading():
+    long_answer = "x" * (MAX_ANSWER_LENGTH * 200)
+    columns = flatten_answers([(1, {"1": long_answer, "2": "42"})])
+    assert max(len(answer) for answer in columns[2]) == MAX_ANSWER_LENGTH
+    # Stored rows go straight to score_columns on regrade
+    assert score_columns([1, 1], [1, 2], [long_answer, "42"], QUESTIONS) == {1: 20}
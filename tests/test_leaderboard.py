@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+
+import orjson
+from sqlmodel import Session
+
+from app.leaderboard import LEADERBOARD_TOPIC, Leaderboard, format_time_taken
+from app.models import Team
+from app.pubsub import hub
+
+
+def ranked_names(board):
+    return [row["name"] for row in orjson.loads(board.snapshot()[1].body)]
+
+
+def test_ranks_by_score_then_time_then_id():
+    board = Leaderboard()
+    board.load([(1, "slow", 50, 90.0), (2, "fast", 50, 30.0), (3, "best", 80, 120.0), (4, "tied", 50, 30.0)])
+    assert ranked_names(board) == ["best", "fast", "tied", "slow"]
+
+
+def test_record_moves_an_existing_team():
+    board = Leaderboard()
+    board.load([(1, "a", 50, 10.0), (2, "b", 40, 10.0)])
+    assert board.record(3, "c", 30, 10.0) == 3
+    assert board.record(3, "c", 60, 10.0) == 1
+    assert ranked_names(board) == ["c", "a", "b"]
+
+
+def test_record_many_inserts_every_team():
+    board = Leaderboard()
+    board.record_many([(1, "a", 10, 5.0), (2, "b", 20, None)])
+    rows = orjson.loads(board.snapshot()[1].body)
+    assert rows == [
+        {"name": "b", "score": 20, "time_taken": "0s"},
+        {"name": "a", "score": 10, "time_taken": "0m 5s 0ms"},
+    ]
+
+
+def test_snapshot_is_cached_until_the_next_change():
+    board = Leaderboard()
+    version, payload = board.snapshot()
+    assert board.snapshot()[1] is payload
+    board.record(1, "a", 10, 5.0)
+    new_version, new_payload = board.snapshot()
+    assert new_version == version + 1
+    assert new_payload.etag != payload.etag
+    board.clear()
+    assert board.snapshot()[1].body == b"[]"
+    assert Leaderboard().snapshot()[1].etag != Leaderboard().snapshot()[1].etag  # per-process epoch
+
+
+def test_rebuild_loads_only_finished_teams(db):
+    with Session(db) as session:
+        session.add(Team(id=1, name="done", status="approved", score=30, time_taken_seconds=12.5,
+                         start_time=datetime(2026, 1, 1), end_time=datetime(2026, 1, 1, 0, 1)))
+        session.add(Team(id=2, name="playing", status="approved", score=0, start_time=datetime(2026, 1, 1)))
+        session.commit()
+        board = Leaderboard()
+        board.rebuild(session)
+    assert ranked_names(board) == ["done"]
+
+
+def test_format_time_taken():
+    assert format_time_taken(None) == "0s"
+    assert format_time_taken(125.25) == "2m 5s 250ms"
+
+
+def published_deltas(change):
+    async def collect():
+        with hub.subscribe(LEADERBOARD_TOPIC) as queue:
+            change()
+            await asyncio.sleep(0)
+            deltas = []
+            while not queue.empty():
+                deltas.append(orjson.loads(queue.get_nowait()))
+            return deltas
+    return asyncio.run(collect())
+
+
+def test_record_publishes_rank_deltas():
+    board = Leaderboard()
+    board.load([(1, "a", 50, 10.0)])
+
+    def change():
+        board.record(2, "b", 40, 10.0)
+        board.record(2, "b", 60, 10.0)
+
+    assert published_deltas(change) == [
+        {"type": "insert", "version": 2, "rank": 2, "previous_rank": None,
+         "row": {"name": "b", "score": 40, "time_taken": "0m 10s 0ms"}},
+        {"type": "insert", "version": 3, "rank": 1, "previous_rank": 2,
+         "row": {"name": "b", "score": 60, "time_taken": "0m 10s 0ms"}},
+    ]
+
+
+def test_load_and_clear_publish_resets():
+    board = Leaderboard()
+
+    def change():
+        board.load([(1, "a", 50, 10.0)])
+        board.clear()
+
+    assert published_deltas(change) == [{"type": "reset", "version": 1}, {"type": "reset", "version": 2}]
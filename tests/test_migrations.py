@@ -0,0 +1,38 @@
+from sqlalchemy import inspect, text
+
+from app.migrations import MIGRATIONS, run_migrations
+from explain_queries import EXPECTED_SCANS, QUERIES, explain, is_full_scan
+
+
+def test_migrations_add_the_team_indexes(db):
+    assert run_migrations(db) == [version for version, _, _ in MIGRATIONS]
+    indexes = {index["name"] for index in inspect(db).get_indexes("team")}
+    assert {"ix_team_status_id", "ix_team_status_score", "ix_team_finished_rank"} <= indexes
+    with db.connect() as connection:
+        sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'ix_team_finished_rank'")).scalar_one()
+        assert "WHERE end_time IS NOT NULL" in sql
+        assert connection.execute(text("SELECT version, name FROM schema_migrations")).all() == [
+            (1, "team_hot_path_indexes"),
+        ]
+
+
+def test_migrations_run_once(db):
+    run_migrations(db)
+    assert run_migrations(db) == []
+
+
+def test_hot_queries_avoid_full_table_scans(db):
+    run_migrations(db)
+    with db.connect() as connection:
+        for name, statement in QUERIES.items():
+            plan = explain(connection, statement)
+            if name not in EXPECTED_SCANS:
+                assert not any(is_full_scan(line) for line in plan), (name, plan)
+        connection.rollback()
+
+
+def test_is_full_scan():
+    assert is_full_scan("SCAN team")
+    assert not is_full_scan("SCAN team USING INDEX ix_team_finished_rank")
+    assert not is_full_scan("SEARCH team USING INDEX ix_team_status_id (status=?)")
+    assert is_full_scan("Seq Scan on team  (cost=0.00..1.01 rows=1 width=4)")
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from app import assembly
+from app.models import Question, Team, TeamAnswer
+from app.progress import PROGRESS_MAX_RETRIES, LiveProgress, ProgressBuffer, answered_counts
+
+
+def add_teams(engine, *finished):
+    with Session(engine) as session:
+        teams = [
+            Team(name=f"team {index}", roll_number=str(index), rc_number=str(index), status="approved",
+                 end_time=datetime.now() if done else None)
+            for index, done in enumerate(finished)
+        ]
+        session.add_all(teams)
+        session.commit()
+        return [team.id for team in teams]
+
+
+def stored_answers(engine):
+    with Session(engine) as session:
+        return sorted(session.exec(select(TeamAnswer.team_id, TeamAnswer.question_id, TeamAnswer.answer)).all())
+
+
+def test_record_keeps_only_valid_known_ids():
+    buffer = ProgressBuffer()
+    saved = buffer.record(1, {"1": "a", "02": "b", "²": "x", "٣": "y", "9": "z"}, known_ids={"1", "2"})
+    assert saved == 2
+    assert buffer.pending(1) == {"1": "a", "2": "b"}
+    assert buffer.record(2, {"²": "x"}) == 0
+    assert buffer.stats()["dirty_teams"] == 1
+
+
+def test_flush_writes_open_teams_only(db):
+    playing, finished = add_teams(db, False, True)
+    buffer = ProgressBuffer()
+    buffer.record(playing, {"1": "a", "2": "b"})
+    buffer.record(finished, {"1": "late"})
+    asyncio.run(buffer.flush())
+    assert stored_answers(db) == [(playing, 1, "a"), (playing, 2, "b")]
+    assert buffer.stats()["dirty_teams"] == 0
+
+
+def test_invalid_keys_never_reach_flush(db):
+    (team_id,) = add_teams(db, False)
+    buffer = ProgressBuffer()
+    buffer.record(team_id, {"²": "x", "3": "c"})
+    asyncio.run(buffer.flush())
+    assert stored_answers(db) == [(team_id, 3, "c")]
+    assert buffer.stats()["failures"] == 0
+
+
+def test_failing_team_does_not_block_the_others(db):
+    good, bad = add_teams(db, False, False)
+    buffer = ProgressBuffer()
+    write = buffer._write
+
+    async def failing_write(batch):
+        if bad in batch:
+            raise RuntimeError("poisoned row")
+        return await write(batch)
+
+    buffer._write = failing_write
+    buffer.record(good, {"1": "a"})
+    buffer.record(bad, {"1": "b"})
+
+    async def flush_until_given_up():
+        for _ in range(PROGRESS_MAX_RETRIES + 1):
+            await buffer.flush()
+
+    asyncio.run(flush_until_given_up())
+    assert stored_answers(db) == [(good, 1, "a")]
+    assert buffer.stats()["dirty_teams"] == 0
+    assert buffer.stats()["flushes"] == 1
+
+
+def add_questions(engine, count):
+    with Session(engine) as session:
+        session.add_all([Question(content_text=f"q{i}", answer="a", difficulty="Easy", points=10) for i in range(count)])
+        session.commit()
+
+
+def add_answers(engine, team_id, answers):
+    with Session(engine) as session:
+        session.add_all([TeamAnswer(team_id=team_id, question_id=q_id, answer=a) for q_id, a in answers.items()])
+        session.commit()
+
+
+def test_answered_counts_pages_teams_still_playing(db):
+    add_questions(db, 2)
+    first, finished, second = add_teams(db, False, True, False)
+    # 99 is not in the bank and the blank answer doesn't count
+    add_answers(db, first, {1: "a", 2: "", 99: "x"})
+    add_answers(db, finished, {1: "a"})
+    add_answers(db, second, {1: "a", 2: "b"})
+    with Session(db) as session:
+        page, cursor = answered_counts(session, None, 1)
+        assert page == [(first, "team 0", 1)]
+        page, cursor = answered_counts(session, int(cursor), 1)
+        assert page == [(second, "team 2", 2)] and cursor is None
+
+
+def test_answered_counts_only_the_teams_own_questions(db, monkeypatch):
+    monkeypatch.setattr(assembly, "QUIZ_QUESTIONS_PER_TEAM", 1)
+    add_questions(db, 3)
+    (team_id,) = add_teams(db, False)
+    with Session(db) as session:
+        assert len(assembly.assign_questions(session, [team_id])[team_id]) == 1
+        session.commit()
+    add_answers(db, team_id, {1: "a", 2: "b", 3: "c"})
+    with Session(db) as session:
+        assert answered_counts(session, None, 10) == ([(team_id, "team 0", 1)], None)
+
+
+def test_live_progress_is_cached_for_its_ttl(db):
+    add_questions(db, 1)
+    (team_id,) = add_teams(db, False)
+    view = LiveProgress(ttl=60)
+    with Session(db) as session:
+        before = view.get(session, None, 10)
+        add_answers(db, team_id, {1: "a"})
+        assert view.get(session, None, 10) is before
+        assert LiveProgress(ttl=0).get(session, None, 10) == ([(team_id, "team 0", 1)], None)
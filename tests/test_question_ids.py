@@ -0,0 +1,33 @@
+import pytest
+
+from app.assembly import only_assigned
+from app.grading import flatten_answers
+from app.question_cache import MAX_QUESTION_ID, parse_question_id
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", 1),
+    ("007", 7),
+    (str(MAX_QUESTION_ID), MAX_QUESTION_ID),
+    (str(MAX_QUESTION_ID + 1), None),
+    ("²", None),  # isdigit() but int() rejects it
+    ("٣", None),  # int() would accept it
+    (" 3", None),
+    ("1_0", None),
+    ("-1", None),
+    ("", None),
+    (3, None),
+])
+def test_parse_question_id(value, expected):
+    assert parse_question_id(value) == expected
+
+
+def test_only_assigned_drops_malformed_and_unassigned_ids():
+    answers = {"1": "a", "2": "b", "²": "x", "٣": "y"}
+    assert only_assigned(answers, {1, 3}) == {"1": "a"}
+    assert only_assigned(answers, None) is answers
+
+
+def test_flatten_answers_skips_malformed_ids():
+    columns = flatten_answers([(1, {"1": "a", "²": "x", "99999999999": "z"}), (2, {"3": None})])
+    assert columns == ([1, 2], [1, 3], ["a", ""])
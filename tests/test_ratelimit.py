@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app import ratelimit
+from app.ratelimit import SlidingWindowLimiter
+from app.routers import auth
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_blocks_after_the_limit_with_retry_after(clock):
+    limiter = SlidingWindowLimiter(limit=2, window=60)
+    assert limiter.hit("alice") == 0
+    clock[0] += 10
+    assert limiter.hit("alice") == 0
+    clock[0] += 5
+    assert limiter.hit("alice") == pytest.approx(45)
+    assert limiter.hit("bob") == 0
+
+
+def test_window_slides(clock):
+    limiter = SlidingWindowLimiter(limit=2, window=60)
+    limiter.hit("alice")
+    clock[0] += 30
+    limiter.hit("alice")
+    clock[0] += 30  # the first hit has left the window
+    assert limiter.hit("alice") == 0
+    assert limiter.hit("alice") == pytest.approx(30)
+
+
+def test_blocked_hits_do_not_extend_the_window(clock):
+    limiter = SlidingWindowLimiter(limit=1, window=60)
+    limiter.hit("alice")
+    for _ in range(5):
+        clock[0] += 10
+        limiter.hit("alice")
+    clock[0] += 10
+    assert limiter.hit("alice") == 0
+
+
+def test_reset_clears_a_key(clock):
+    limiter = SlidingWindowLimiter(limit=1, window=60)
+    limiter.hit("alice")
+    limiter.reset("alice")
+    limiter.reset("nobody")
+    assert limiter.hit("alice") == 0
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=2)
+    limiter.hit("a")
+    limiter.hit("b")
+    limiter.hit("a")  # blocked, but marks "a" as recently used
+    limiter.hit("c")
+    assert list(limiter._hits) == ["a", "c"]
+
+
+def test_verify_password_runs_on_the_hash_pool():
+    password_hash = auth.pwd_context.hash("secret")
+    assert asyncio.run(auth.verify_password("secret", password_hash))
+    assert not asyncio.run(auth.verify_password("wrong", password_hash))
+    assert not asyncio.run(auth.verify_password("secret", None))  # unknown username
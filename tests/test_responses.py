@@ -0,0 +1,115 @@
+import asyncio
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import responses
+from app.responses import CachedPayload, CompressionMiddleware, cached_response, dumps
+
+LARGE = dumps([{"id": index, "name": f"team {index}"} for index in range(100)])
+PAYLOAD = CachedPayload(LARGE, '"v1"')
+
+
+async def cached(request):
+    return await cached_response(request, PAYLOAD)
+
+
+async def small(request):
+    return await cached_response(request, CachedPayload(b"[]", '"v0"'))
+
+
+async def text(request):
+    return PlainTextResponse("x" * 2000)
+
+
+async def streamed(request):
+    async def chunks():
+        for index in range(3):
+            yield f"line {index}\n" * 100
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def events(request):
+    async def chunks():
+        yield "data: hello\n\n" * 100
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = Starlette(routes=[
+        Route("/cached", cached), Route("/small", small), Route("/text", text),
+        Route("/streamed", streamed), Route("/events", events),
+    ])
+    app.add_middleware(CompressionMiddleware)
+    with TestClient(app) as client:
+        yield client
+
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_matching_etag_gets_an_empty_304(client):
+    response = client.get("/cached", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"v1"'
+
+
+def test_cached_payload_is_sent_precompressed(client):
+    response = client.get("/cached", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == LARGE
+    assert PAYLOAD.encoded("gzip") is PAYLOAD.encoded("gzip")
+
+
+def test_payloads_under_the_threshold_are_not_compressed(client):
+    response = client.get("/small", headers=GZIP)
+    assert "content-encoding" not in response.headers
+    assert client.get("/cached", headers={"Accept-Encoding": "identity"}).headers.get("content-encoding") is None
+
+
+def test_brotli_is_preferred_when_available(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/cached", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(PAYLOAD.encoded("br")) == LARGE
+
+
+def test_encoded_async_matches_encoded():
+    payload = CachedPayload(LARGE, '"v2"', fast=True)
+    data = asyncio.run(payload.encoded_async("gzip"))
+    assert gzip.decompress(data) == LARGE
+    assert payload.encoded("gzip") is data
+    assert asyncio.run(payload.encoded_async("")) is LARGE
+
+
+def test_middleware_compresses_text_responses(client):
+    response = client.get("/text", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 2000
+    assert response.text == "x" * 2000
+
+
+def test_middleware_compresses_streams_chunk_by_chunk(client):
+    response = client.get("/streamed", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"line {index}\n" * 100 for index in range(3))
+
+
+def test_middleware_leaves_event_streams_alone(client):
+    response = client.get("/events", headers=GZIP)
+    assert "content-encoding" not in response.headers
+    assert response.text.startswith("data: hello")
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    assert responses.accepted_encoding({"accept-encoding": "br, gzip"}) == "gzip"
+    assert responses.accepted_encoding({"accept-encoding": "br"}) == ""
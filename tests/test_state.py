@@ -0,0 +1,45 @@
+from app.state import MemoryBackend
+from conftest import wait_for
+
+
+def test_memory_backend_broadcast_is_a_no_op():
+    backend = MemoryBackend()
+    received = []
+    backend.on("channel", received.append)
+    backend.broadcast("channel", {"teams": [1]})
+    assert received == []
+
+
+def test_resync_sends_none_to_every_handler():
+    backend = MemoryBackend()
+    received = []
+    backend.on("a", received.append)
+    backend.on("b", received.append)
+    backend._resync()
+    assert received == [None, None]
+
+
+def test_failing_handler_does_not_stop_the_others():
+    backend = MemoryBackend()
+    received = []
+    backend.on("channel", lambda message: 1 / 0)
+    backend.on("channel", received.append)
+    backend._dispatch("channel", "hello")
+    assert received == ["hello"]
+
+
+def test_broadcast_reaches_other_workers_only(redis_backends):
+    local, remote = redis_backends
+    received, echoed = [], []
+    remote.on("channel", received.append)
+    local.on("channel", echoed.append)
+    for backend in redis_backends:
+        backend.start()
+    local.broadcast("channel", {"teams": [1, 2]})
+    assert wait_for(lambda: received)
+    assert received == [{"teams": [1, 2]}]
+    assert echoed == []
+
+
+def test_unserializable_broadcast_is_logged_not_raised(redis_backends):
+    redis_backends[0].broadcast("channel", {1: "int keys are not JSON"})
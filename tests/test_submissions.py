@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app import submissions
+from app.progress import ProgressBuffer
+from app.submissions import SubmissionQueue
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = ProgressBuffer()
+    monkeypatch.setattr(submissions, "progress_buffer", buffer)
+    return buffer
+
+
+def submit(queue, handler, team_id, answers):
+    async def main():
+        queue.queue.handler = handler
+        queue.queue.max_retries = 0
+        queue.enqueue(team_id, answers, datetime.now())
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_checkpoints_travel_with_the_submission(buffer):
+    graded = []
+
+    async def handler(items):
+        graded.extend(items)
+        return [True] * len(items)
+
+    buffer.record(1, {"1": "saved", "2": "old"})
+    queue = SubmissionQueue()
+    submit(queue, handler, 1, {"2": "final"})
+    assert graded[0][1] == {"1": "saved", "2": "final"}
+    assert buffer.pending(1) == {}
+    assert not queue.failed(1)
+
+
+def test_failed_submission_is_kept_for_another_try(buffer):
+    async def handler(items):
+        raise RuntimeError("database unavailable")
+
+    buffer.record(1, {"1": "saved"})
+    queue = SubmissionQueue()
+    submit(queue, handler, 1, {"2": "final"})
+    assert queue.failed(1)
+    assert not queue.is_pending(1)
+    # Back in the buffer, so the next flush checkpoints it and /quiz restores it
+    assert buffer.pending(1) == {"1": "saved", "2": "final"}
+    assert buffer.stats()["dirty_teams"] == 1
+
+
+def test_held_answers_are_not_flushed(buffer):
+    buffer.record(1, {"1": "a"})
+    assert buffer.hold(1) == {"1": "a"}
+    assert buffer.stats()["dirty_teams"] == 0
+    assert buffer.pending(1) == {"1": "a"}
+    buffer.release(1)
+    assert buffer.pending(1) == {}
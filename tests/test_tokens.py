@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from app import tokens
+from app.tokens import TokenSigner, TTLCache
+
+
+def test_claims_are_bound_to_the_team():
+    signer = TokenSigner("secret")
+    token = signer.issue_player(1, "team", datetime(2026, 1, 1))
+    assert signer.player_claims(token, 2) is None
+    assert signer.player_claims(token, 1)["start"] == datetime(2026, 1, 1)
+
+
+def test_player_and_admin_tokens_are_not_interchangeable():
+    signer = TokenSigner("secret")
+    player = signer.issue_player(1, "team", datetime(2026, 1, 1))
+    admin = signer.issue_admin(1, "root")
+    assert signer.admin_claims(player) is None
+    assert signer.player_claims(admin, 1) is None
+    assert signer.admin_claims(admin)["username"] == "root"
+    assert TokenSigner("other").admin_claims(admin) is None
+    assert signer.admin_claims(None) is None
+
+
+def test_revoke_all_invalidates_issued_tokens(db, monkeypatch):
+    monkeypatch.setattr(tokens, "engine", db)
+    signer = TokenSigner("secret")
+    token = signer.issue_player(1, "team", datetime(2026, 1, 1))
+    signer.revoke_all()
+    assert signer.player_claims(token, 1) is None
+    fresh = signer.issue_player(1, "team", datetime(2026, 1, 1))
+    assert signer.player_claims(fresh, 1) is not None
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tokens.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" is the least recently used
+    assert cache.get("b") is None
+    now[0] += 60
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_revocation_survives_a_restart(db, monkeypatch):
+    monkeypatch.setattr(tokens, "engine", db)
+    signer = TokenSigner("secret")
+    signer.load_generation()
+    token = signer.issue_player(1, "team", datetime(2026, 1, 1))
+    signer.revoke_all()
+
+    restarted = TokenSigner("secret")
+    restarted.load_generation()
+    assert restarted.generation == signer.generation == 1
+    assert restarted.player_claims(token, 1) is None
+
+
+def test_generation_never_goes_backwards():
+    signer = TokenSigner("secret")
+    signer._advance(3)
+    signer._advance(2)  # a stale broadcast
+    assert signer.generation == 3